@@ -1,35 +1,147 @@
 import uvicorn
-import fastf1
-import pandas as pd
-import joblib
+import asyncio
 import os
-from fastapi import FastAPI, HTTPException
+import pandas as pd
+import time
+from fastapi import FastAPI, HTTPException, Header, Query, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
 import numpy as np
-from typing import Optional
-
-print("Starting Prediction & Insights API...")
-
-# --- 1. Load Model ---
-try:
-    model = joblib.load('f1_prediction_model.joblib')
-    print("Prediction Model loaded.")
-except FileNotFoundError:
-    print("Warning: Prediction model not found.")
-
-# --- 2. Load Historical Data ---
-HISTORICAL_DATA_FILE = 'f1_race_data_2018_2024.csv'
-historical_df = pd.DataFrame()
-try:
-    historical_df = pd.read_csv(HISTORICAL_DATA_FILE)
-    historical_df['Position'] = pd.to_numeric(historical_df['Position'], errors='coerce')
-    historical_df['GridPosition'] = pd.to_numeric(historical_df['GridPosition'], errors='coerce')
-    historical_df['Points'] = pd.to_numeric(historical_df['Points'], errors='coerce')
+import json
+from typing import Dict, List, Optional, Tuple
+from season_store import SeasonResultsStore
+from race_features import ensure_prior_rounds, missing_prior_rounds, race_features, season_features, format_predictions
+from scenarios import score_scenarios
+from simulation import project_season, race_distribution
+from dataset import changes_since, load_dataset, published_version
+from insights import InsightsCache
+from career_index import CareerIndex
+from form_features import FormIndex
+from concurrency import SingleFlight, run_blocking
+from session_cache import SessionCache
+from response_cache import ResponseCache
+from data_source import get_source
+from model_registry import ModelRegistry
+from artifacts import Artifacts, NotReady
+from contextlib import asynccontextmanager
+import metrics
+
+# --- Cache ---
+# Sessions come from live FastF1 (with its disk cache) or, with F1_DATA_SOURCE=replay,
+# from local files only. Loaded sessions and schedules stay in RAM (LRU, size-bounded).
+sessions = SessionCache(source=get_source())
+
+# --- Season Results Store ---
+season_store = SeasonResultsStore()
+
+# --- Response Cache ---
+# /predict bodies of finished races, compressed on disk and shared by all workers
+response_cache = ResponseCache()
+
+# --- In-flight request coalescing ---
+inflight = SingleFlight()
+
+# --- Insights Cache ---
+insights_cache = InsightsCache()
+
+# --- Career / head-to-head index ---
+# Rebuilt from the season store whenever the historical data (re)loads; rounds the store adds or
+# corrects later are folded in as they arrive
+career_index = CareerIndex()
+season_store.subscribe(career_index.add_round)
+
+# --- Form index ---
+# Driver/constructor form over the whole stored history, as in training; kept current by the season store
+form_index = FormIndex()
+season_store.subscribe(form_index.add_round)
+
+# --- Artifacts (loaded in the background after startup) ---
+HISTORICAL_COLUMNS = ['Year', 'RoundNumber', 'RaceName', 'Abbreviation', 'FullName', 'TeamName',
+                      'GridPosition', 'Position', 'Points', 'TrackTemp', 'Rainfall']
+
+# Published dataset version the derived caches reflect (see dataset.publish_version)
+dataset_state = {"version": 0}
+DATASET_POLL_SECONDS = float(os.environ.get('F1_DATASET_POLL_SECONDS', '10'))
+
+def _load_historical():
+    dataset_state['version'] = published_version()
+    historical_df = load_dataset(HISTORICAL_COLUMNS)
     print(f"Historical data loaded: {len(historical_df)} rows.")
-except FileNotFoundError:
-    print(f"Warning: {HISTORICAL_DATA_FILE} not found.")
+    print(f"Season store seeded with {season_store.seed(historical_df)} rounds.")
+    print(f"Insights precomputed for {insights_cache.refresh(historical_df)} seasons.")
+    stored = pd.concat([season_store.season_results(y) for y in season_store.years()], ignore_index=True)
+    print(f"Career index built from {career_index.build(stored)} rounds.")
+    print(f"Form index built from {form_index.build(stored)} rounds.")
+    return historical_df
+
+def _sync_dataset():
+    """Bring derived caches up to date with the dataset.
+
+    Rounds published since the last sync (e.g. by `build_dataset.py --watch`) are
+    applied incrementally: season store, career index and the insights of their
+    seasons only. Unpublished rewrites fall back to a full insights refresh.
+    """
+    latest, rounds = changes_since(dataset_state['version'])
+    rounds = set(rounds)
+    if rounds:
+        years = sorted({y for y, _ in rounds})
+        df = load_dataset(HISTORICAL_COLUMNS, years=years)
+        for (year, round_number), rows in df.groupby(['Year', 'RoundNumber']):
+            if (year, round_number) in rounds:
+                season_store.add_round(year, round_number, rows)
+        insights_cache.refresh_years(df)
+        print(f"Dataset version {latest}: applied {len(rounds)} new rounds for {years}.")
+    dataset_state['version'] = latest
+    if insights_cache.stale(force=True):
+        insights_cache.refresh()
+    return latest
+
+async def _follow_dataset():
+    while True:
+        await asyncio.sleep(DATASET_POLL_SECONDS)
+        if not artifacts.loaded('historical_data'):
+            continue
+        try:
+            await inflight.do(('dataset-sync',), _sync_dataset)
+        except Exception as e:
+            print(f"!! Dataset sync failed: {e}")
+
+# --- Model Registry ---
+registry = ModelRegistry()
+# Activations and promotions reach this process by polling CURRENT (other workers write it)
+MODEL_POLL_SECONDS = float(os.environ.get('F1_MODEL_POLL_SECONDS', '10'))
 
-app = FastAPI(title="F1 API", description="Enhanced Analytics Hub")
+async def _follow_model():
+    while True:
+        await asyncio.sleep(MODEL_POLL_SECONDS)
+        if not artifacts.loaded('model'):
+            continue
+        try:
+            current = await run_blocking(registry.current_version)
+            if current != artifacts.get('model').version:
+                print(f"Model version changed to {current}; reloading")
+                await inflight.do(('reload-model',), artifacts.load, 'model')
+        except Exception as e:
+            print(f"!! Model version check failed: {e}")
+
+artifacts = Artifacts()
+# Active registry version (compact array export, no unpickling)
+artifacts.register('model', registry.reload_current)
+artifacts.register('historical_data', _load_historical)
+
+@asynccontextmanager
+async def lifespan(app):
+    print("Starting Prediction & Insights API...")
+    # Workers forked by serve.py inherit the artifacts already loaded
+    artifacts.start_background(missing_only=True)
+    followers = [asyncio.create_task(_follow_dataset()), asyncio.create_task(_follow_model())]
+    yield
+    for follower in followers:
+        follower.cancel()
+
+app = FastAPI(title="F1 API", description="Enhanced Analytics Hub", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -39,135 +151,401 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# --- Cache ---
-CACHE_DIR = 'cache'
-if not os.path.exists(CACHE_DIR): os.makedirs(CACHE_DIR)
-fastf1.Cache.enable_cache(CACHE_DIR)
+def _route_label(request):
+    # Route template (/insights/{year}) rather than the raw path, to keep label cardinality bounded
+    route = request.scope.get('route')
+    return route.path if route else 'unmatched'
+
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    except Exception as e:
+        metrics.REQUEST_FAILURES.inc(endpoint=_route_label(request), error=type(e).__name__)
+        raise
+    finally:
+        metrics.REQUEST_LATENCY.observe(time.perf_counter() - start, method=request.method,
+                                        route=_route_label(request), status=status)
+
+@metrics.register_collector
+def _session_cache_metrics():
+    stats = sessions.stats()
+    return [
+        ("f1_session_cache_requests_total", "counter", "Session/schedule cache lookups by result.",
+         [({"result": "hit"}, stats['hits']), ({"result": "miss"}, stats['misses'])]),
+        ("f1_session_cache_evictions_total", "counter", "Session/schedule cache evictions.", [({}, stats['evictions'])]),
+        ("f1_session_cache_bytes", "gauge", "Estimated bytes held by the session cache.", [({}, stats['bytes'])]),
+        ("f1_session_cache_entries", "gauge", "Entries in the session cache.", [({}, stats['entries'])]),
+        ("f1_response_cache_bytes", "gauge", "Compressed bytes in the on-disk /predict response cache.",
+         [({}, response_cache.stats()['bytes'])]),
+    ]
+
+@app.get("/metrics")
+async def get_metrics():
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    ready = artifacts.ready()
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "artifacts": artifacts.status()})
+
+@app.post("/admin/reload")
+async def reload_artifacts():
+    """Reload model and data in place; requests keep using the old ones until the swap."""
+    ok = await inflight.do(('reload',), artifacts.load_all)
+    return JSONResponse(status_code=200 if ok else 500, content={"reloaded": ok, "artifacts": artifacts.status()})
+
+def _load_schedule(year):
+    races = sessions.schedule(year)
+    result = []
+    for _, row in races.iterrows():
+        result.append({
+            "round": int(row['RoundNumber']),
+            "name": row['EventName'],
+            "date": str(row['EventDate'])
+        })
+    return result
 
 @app.get("/schedule/{year}")
 async def get_schedule(year: int):
     try:
-        schedule = fastf1.get_event_schedule(year, include_testing=False)
-        races = schedule[schedule['EventFormat'] != 'testing']
-        result = []
-        for _, row in races.iterrows():
-            result.append({
-                "round": int(row['RoundNumber']),
-                "name": row['EventName'],
-                "date": str(row['EventDate'])
-            })
-        return result
+        return await inflight.do(('schedule', year), _load_schedule, year)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/predict")
-async def predict_race(year: Optional[int] = None, round_num: Optional[int] = None):
+def _get_model(version=None):
+    """Active model, or a pinned registry version."""
+    if version is None:
+        return artifacts.get('model')
     try:
-        current_year = pd.Timestamp.now().year
-        if year is None or round_num is None:
-            year_to_load = current_year
-            schedule = fastf1.get_event_schedule(year_to_load, include_testing=False)
-            races_completed = schedule[schedule['EventDate'] < pd.to_datetime('now')]
-            if races_completed.empty:
-                year_to_load = current_year - 1
-                schedule = fastf1.get_event_schedule(year_to_load, include_testing=False)
-                last_race = schedule.iloc[-1]
-            else:
-                last_race = races_completed.iloc[-1]
-            round_to_load = int(last_race['RoundNumber'])
-        else:
-            year_to_load = year
-            round_to_load = round_num
-            schedule = fastf1.get_event_schedule(year_to_load, include_testing=False)
-            selected_event = schedule[schedule['RoundNumber'] == round_to_load].iloc[0]
-            last_race = selected_event
-
-        full_schedule = fastf1.get_event_schedule(year_to_load, include_testing=False)
-        prior_rounds = full_schedule[full_schedule['RoundNumber'] < round_to_load]['RoundNumber']
-        season_results_list = []
-        for r in prior_rounds:
-            try:
-                s = fastf1.get_session(year_to_load, r, 'R')
-                s.load(weather=False, telemetry=False, messages=False)
-                if s.results is not None:
-                    res = s.results.copy()
-                    res['RoundNumber'] = r
-                    season_results_list.append(res)
-            except: pass
-        all_season_results = pd.concat(season_results_list) if season_results_list else pd.DataFrame()
-
-        session = fastf1.get_session(year_to_load, round_to_load, 'R')
-        session.load(weather=True, telemetry=False, messages=False)
-        race_data = session.results
-        weather = session.weather_data.iloc[0]
-        
-        form_data = pd.DataFrame()
-        if not all_season_results.empty:
-            all_season_results['Points'] = pd.to_numeric(all_season_results['Points'], errors='coerce')
-            d_form = all_season_results.groupby('Abbreviation')['Points'].rolling(5, min_periods=1).mean().reset_index().groupby('Abbreviation').last()['Points']
-            c_form = all_season_results.groupby('TeamName')['Points'].rolling(5, min_periods=1).mean().reset_index().groupby('TeamName').last()['Points']
-            form_data['driver_form'] = race_data['Abbreviation'].map(d_form).fillna(0)
-            form_data['constructor_form'] = race_data['TeamName'].map(c_form).fillna(0)
+        return registry.get(version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+def _form_index():
+    # Empty until the stored history has been indexed; serving zero form meanwhile would be wrong
+    if not artifacts.loaded('historical_data'):
+        raise NotReady("historical_data is not loaded yet")
+    return form_index
+
+def _predict_race(year, round_num, model_version=None):
+    """Blocking part of /predict: FastF1 loads, feature building and inference."""
+    with metrics.endpoint('predict'):
+        return _predict_race_stages(year, round_num, model_version)
+
+def _json_body(content):
+    # Same encoding as JSONResponse, so cached and computed bodies are byte-identical
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def _predict_race_stages(year, round_num, model_version):
+    """JSON body (bytes) of a /predict response."""
+    # Resolve the model first so a swap mid-request can't mix versions
+    model = _get_model(model_version)
+    model_key = model.meta.get('fingerprint', model.version)
+    form = _form_index()
+    if year is not None and round_num is not None:
+        # Bodies depend on the stored results up to the race too: a corrected round changes the key
+        body = response_cache.get(model_key, year, round_num, form.history_digest(year, round_num))
+        metrics.CACHE_EVENTS.inc(cache='response', result='hit' if body is not None else 'miss')
+        if body is not None:
+            return body
+    with metrics.stage('schedule'):
+        year_to_load, round_to_load, schedule, last_race = _resolve_race(year, round_num)
+    history = form.history_digest(year_to_load, round_to_load)
+    race_data, X = race_features(season_store, sessions, year_to_load, round_to_load, schedule, form)
+    with metrics.stage('model_predict'):
+        predicted = model.predict(X)
+    predictions = format_predictions(race_data, predicted)
+    body = _json_body({"race_name": f"{year_to_load} {last_race['EventName']}", "model_version": model.version,
+                       "predictions": predictions})
+    # Only finished races are final; a race still without results, or whose form missed prior
+    # rounds that failed to load, would be stored too early. A round corrected while this
+    # one was computed may not be reflected in it, so that body isn't stored either.
+    if (any(p['ActualPosition'] is not None for p in predictions)
+            and not missing_prior_rounds(season_store, year_to_load, round_to_load, schedule)
+            and form.history_digest(year_to_load, round_to_load) == history):
+        try:
+            response_cache.put(model_key, year_to_load, round_to_load, history, body)
+        except OSError as e:
+            # The response is already computed; a failed store only costs a later recompute
+            print(f"!! Response cache write failed for {year_to_load} round {round_to_load}: {e}")
+    return body
+
+def _resolve_race(year, round_num):
+    """(year, round, schedule, event) for the requested race, or the latest finished one."""
+    current_year = pd.Timestamp.now().year
+    if year is None or round_num is None:
+        year_to_load = current_year
+        schedule = sessions.schedule(year_to_load)
+        races_completed = schedule[schedule['EventDate'] < pd.to_datetime('now')]
+        if races_completed.empty:
+            year_to_load = current_year - 1
+            schedule = sessions.schedule(year_to_load)
+            last_race = schedule.iloc[-1]
         else:
-            form_data['driver_form'] = 0
-            form_data['constructor_form'] = 0
-
-        df_p = pd.DataFrame()
-        df_p['GridPosition'] = pd.to_numeric(race_data['GridPosition'], errors='coerce').replace(0, 20).fillna(20)
-        df_p = pd.concat([df_p, form_data], axis=1)
-        df_p['AirTemp'], df_p['TrackTemp'], df_p['Humidity'] = weather['AirTemp'], weather['TrackTemp'], weather['Humidity']
-        df_p['Rainfall'] = 1 if weather['Rainfall'] else 0
-
-        features = ['GridPosition', 'driver_form', 'constructor_form', 'AirTemp', 'TrackTemp', 'Humidity', 'Rainfall']
-        race_data['PredictedPosition'] = model.predict(df_p[features])
-        race_data['ActualPosition'] = pd.to_numeric(race_data['Position'], errors='coerce')
-        race_data['PredictedRank'] = race_data['PredictedPosition'].rank(method='first').astype(int)
-        
-        output = race_data.sort_values(by='PredictedRank')[['PredictedRank', 'Abbreviation', 'FullName', 'TeamName', 'GridPosition', 'ActualPosition']]
-        output = output.where(pd.notnull(output), None)
-        return {"race_name": f"{year_to_load} {last_race['EventName']}", "predictions": output.to_dict(orient='records')}
+            last_race = races_completed.iloc[-1]
+        round_to_load = int(last_race['RoundNumber'])
+    else:
+        year_to_load = year
+        round_to_load = round_num
+        schedule = sessions.schedule(year_to_load)
+        selected_event = schedule[schedule['RoundNumber'] == round_to_load].iloc[0]
+        last_race = selected_event
+    return year_to_load, round_to_load, schedule, last_race
+
+@app.get("/predict")
+async def predict_race(year: Optional[int] = None, round_num: Optional[int] = None, model_version: Optional[str] = None):
+    try:
+        # A burst of requests for the same race shares one load + prediction
+        body = await inflight.do(('predict', year, round_num, model_version), _predict_race, year, round_num, model_version)
+        return Response(content=body, media_type="application/json")
+    except HTTPException as e:
+        metrics.REQUEST_FAILURES.inc(endpoint='predict', error=f"http_{e.status_code}")
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
-        return {"error": str(e)}
+        # Failures are real errors (counted, non-200); the body keeps the {"error": ...} shape the frontend reads
+        metrics.REQUEST_FAILURES.inc(endpoint='predict', error=type(e).__name__)
+        return JSONResponse(status_code=503 if isinstance(e, NotReady) else 500, content={"error": str(e)})
+
+class BatchPredictRequest(BaseModel):
+    year: Optional[int] = None
+    races: Optional[List[Tuple[int, int]]] = None
+    model_version: Optional[str] = None
+
+def _predict_batch(races, model_version=None):
+    """Blocking part of /predict/batch. Returns one result dict per requested race."""
+    with metrics.endpoint('predict_batch'):
+        return _predict_batch_stages(races, model_version)
+
+def _predict_batch_stages(races, model_version):
+    by_year = {}
+    for y, r in races:
+        by_year.setdefault(int(y), set()).add(int(r))
+
+    model = _get_model(model_version)
+    form = _form_index()
+    entries, blocks = [], []
+    for y in sorted(by_year):
+        try:
+            for r, event_name, race_data, X, error in season_features(season_store, sessions, y, by_year[y], form):
+                entries.append((y, r, event_name, race_data, error))
+                if X is not None: blocks.append(X)
+        except Exception as e:
+            entries.extend((y, r, None, None, str(e)) for r in sorted(by_year[y]))
+
+    # Score every race with a single model call, then split back per race
+    with metrics.stage('model_predict'):
+        predicted = model.predict(pd.concat(blocks)) if blocks else np.empty(0)
+    results, offset = [], 0
+    for y, r, event_name, race_data, error in entries:
+        if error is not None:
+            metrics.REQUEST_FAILURES.inc(endpoint='predict_batch', error='race')
+            results.append({"year": y, "round": r, "error": error})
+            continue
+        n = len(race_data)
+        results.append({"year": y, "round": r, "race_name": f"{y} {event_name}", "model_version": model.version,
+                        "predictions": format_predictions(race_data, predicted[offset:offset + n])})
+        offset += n
+    return results
+
+@app.post("/predict/batch")
+async def predict_batch(request: BatchPredictRequest):
+    if request.races:
+        races = request.races
+    elif request.year is not None:
+        try:
+            schedule = await run_blocking(sessions.schedule, request.year)
+        except ValueError as e:
+            metrics.REQUEST_FAILURES.inc(endpoint='predict_batch', error='ValueError')
+            raise HTTPException(status_code=404, detail=str(e))
+        except Exception as e:
+            metrics.REQUEST_FAILURES.inc(endpoint='predict_batch', error=type(e).__name__)
+            raise HTTPException(status_code=500, detail=str(e))
+        races = [(request.year, int(r)) for r in schedule['RoundNumber']]
+    else:
+        raise HTTPException(status_code=422, detail="Provide either 'year' or 'races'")
+    try:
+        results = await run_blocking(_predict_batch, races, request.model_version)
+    except NotReady as e:
+        metrics.REQUEST_FAILURES.inc(endpoint='predict_batch', error='NotReady')
+        raise HTTPException(status_code=503, detail=str(e))
+    # One JSON object per line, in (year, round) order
+    return StreamingResponse((json.dumps(r) + "\n" for r in results), media_type="application/x-ndjson")
+
+class ScenarioRequest(BaseModel):
+    year: Optional[int] = None
+    round_num: Optional[int] = None
+    weather: Optional[Dict[str, List[float]]] = None  # swept as a cartesian product
+    grids: Optional[List[Optional[Dict[str, int]]]] = None  # grid overrides by driver; null = actual grid
+    model_version: Optional[str] = None
+
+def _predict_scenarios(request):
+    """Blocking part of /predict/scenarios: one feature build, one model call for all scenarios."""
+    with metrics.endpoint('predict_scenarios'):
+        with metrics.stage('schedule'):
+            year_to_load, round_to_load, schedule, event = _resolve_race(request.year, request.round_num)
+        model = _get_model(request.model_version)
+        race_data, X = race_features(season_store, sessions, year_to_load, round_to_load, schedule, _form_index())
+        with metrics.stage('model_predict'):
+            result = score_scenarios(model, race_data, X, request.weather, request.grids)
+    return {"race_name": f"{year_to_load} {event['EventName']}", "model_version": model.version, **result}
+
+@app.post("/predict/scenarios")
+async def predict_scenarios(request: ScenarioRequest):
+    try:
+        return await run_blocking(_predict_scenarios, request)
+    except NotReady as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        metrics.REQUEST_FAILURES.inc(endpoint='predict_scenarios', error='ValueError')
+        raise HTTPException(status_code=422, detail=str(e))
+
+MAX_SIMULATIONS = 200000
+
+def _simulate_race(year, round_num, n_sims, model_version):
+    with metrics.endpoint('simulate_race'):
+        with metrics.stage('schedule'):
+            year_to_load, round_to_load, schedule, event = _resolve_race(year, round_num)
+        model = _get_model(model_version)
+        race_data, X = race_features(season_store, sessions, year_to_load, round_to_load, schedule, _form_index())
+        with metrics.stage('simulate'):
+            drivers = race_distribution(model, race_data, X, n_sims)
+    return {"race_name": f"{year_to_load} {event['EventName']}", "model_version": model.version,
+            "simulations": n_sims, "drivers": drivers}
+
+def _simulate_season(year, after_round, n_sims, model_version):
+    with metrics.endpoint('simulate_season'):
+        with metrics.stage('schedule'):
+            schedule = sessions.schedule(year)
+        model = _get_model(model_version)
+        if after_round is not None:
+            ensure_prior_rounds(season_store, sessions, year, after_round + 1, schedule)
+        with metrics.stage('simulate'):
+            result = project_season(model, season_store, _form_index(), schedule, year, after_round, n_sims)
+    return {"model_version": model.version, **result}
+
+@app.get("/simulate/race")
+async def simulate_race(year: Optional[int] = None, round_num: Optional[int] = None,
+                        n_sims: int = Query(10000, ge=1, le=MAX_SIMULATIONS), model_version: Optional[str] = None):
+    """Finishing-position probabilities from the forest's per-tree spread."""
+    try:
+        return await run_blocking(_simulate_race, year, round_num, n_sims, model_version)
+    except NotReady as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@app.get("/simulate/season/{year}")
+async def simulate_season(year: int, after_round: Optional[int] = None,
+                          n_sims: int = Query(100000, ge=1, le=MAX_SIMULATIONS), model_version: Optional[str] = None):
+    """Drivers' and constructors' title probabilities with the remaining rounds simulated."""
+    try:
+        return await inflight.do(('simulate-season', year, after_round, n_sims, model_version),
+                                 _simulate_season, year, after_round, n_sims, model_version)
+    except NotReady as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/models")
+async def list_models():
+    serving = artifacts.get('model').version if artifacts.loaded('model') else None
+    return {"current": registry.current_version(), "serving": serving, "versions": registry.versions()}
+
+@app.post("/models/{version}/activate")
+async def activate_model(version: str):
+    """Point CURRENT at `version` and swap it in. In-flight requests finish on the old model."""
+    try:
+        registry.set_current(version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    ok = await inflight.do(('reload-model',), artifacts.load, 'model')
+    return JSONResponse(status_code=200 if ok else 500, content={"activated": ok, "model": artifacts.status()['model']})
+
+def _parse_years(spec, available):
+    """'2018..2024', '2018,2020,2022' or a mix of both, limited to the `available` seasons."""
+    available = set(int(y) for y in available)
+    years = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if '..' in part:
+            start, end = part.split('..', 1)
+            start, end = int(start), int(end)
+            # Clip to seasons that exist rather than expanding the range
+            years.update(y for y in available if start <= y <= end)
+        elif part:
+            years.add(int(part))
+    return years & available
+
+@app.get("/insights")
+async def compare_insights(years: Optional[str] = None, if_none_match: Optional[str] = Header(None)):
+    """Columnar stats of several seasons (default: all) for trend charts."""
+    with metrics.endpoint('insights_compare'):
+        if insights_cache.stale():
+            await inflight.do(('dataset-sync',), _sync_dataset)
+    if not artifacts.loaded('historical_data'): raise HTTPException(status_code=503, detail="Historical data is still loading")
+    if not len(insights_cache): raise HTTPException(status_code=500, detail="No data")
+    try:
+        wanted = _parse_years(years, insights_cache.table.index) if years else insights_cache.table.index
+    except ValueError:
+        raise HTTPException(status_code=422, detail="years must look like 2018..2024 or 2018,2020")
+    cached = insights_cache.compare(wanted)
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if if_none_match and (if_none_match.strip() == '*' or cached.etag in [t.strip() for t in if_none_match.split(',')]):
+        metrics.CACHE_EVENTS.inc(cache='insights', result='not_modified')
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
 
 @app.get("/insights/{year}")
-async def get_year_insights(year: int):
-    if historical_df.empty: raise HTTPException(status_code=500, detail="No data")
-    df_year = historical_df[historical_df['Year'] == year].copy()
-    if df_year.empty: raise HTTPException(status_code=404, detail="No data for year")
-
-    pts = df_year.groupby(['Abbreviation', 'TeamName'])['Points'].sum().sort_values(ascending=False)
-    champ, champ_team = pts.index[0]
-    c_pts = df_year.groupby('TeamName')['Points'].sum().sort_values(ascending=False)
-    winners = df_year[df_year['Position'] == 1]
-    pole_win_pct = round((len(winners[winners['GridPosition'] == 1]) / len(winners)) * 100, 1) if len(winners) > 0 else 0
-    total_entries = len(df_year)
-    
-    # Logic Update: Define DNF based on Position being NaN or specific non-classified status
-    dnfs = df_year['Position'].isna().sum()
-    dnf_rate = round((dnfs / total_entries) * 100, 1)
-    
-    finishers = df_year.dropna(subset=['Position'])
-    finishers['gained'] = finishers['GridPosition'] - finishers['Position']
-    overtake_pts = finishers.groupby('Abbreviation')['gained'].sum().sort_values(ascending=False)
-    overtake_king = overtake_pts.index[0]
-    total_gained = int(overtake_pts.iloc[0])
-    top_10s = df_year[df_year['Position'] <= 10].groupby('Abbreviation').size().sort_values(ascending=False)
-    consistent_driver = top_10s.index[0]
-    consistent_count = int(top_10s.iloc[0])
-    avg_temp = round(df_year['TrackTemp'].mean(), 1)
-
-    return {
-        "year": year,
-        "champion": {"name": champ, "team": champ_team, "points": int(pts.iloc[0]), "detail": f"{champ} secured the title with {len(df_year[(df_year['Abbreviation']==champ) & (df_year['Position']==1)])} victories. Logic: Calculation is based on total points accumulated across all sessions in {year}."},
-        "constructor": {"name": c_pts.index[0], "points": int(c_pts.iloc[0]), "detail": f"{c_pts.index[0]} demonstrated engineering superiority, outperforming the closest rival by {int(c_pts.iloc[0] - c_pts.iloc[1])} points."},
-        "pole_rate": {"value": pole_win_pct, "detail": f"Pole conversion reflects the percentage of race winners who also secured P1 in Qualifying. In {year}, starting on Pole was {'a critical advantage' if pole_win_pct > 50 else 'less predictive of success'} at {pole_win_pct}%."},
-        "reliability": {"value": dnf_rate, "detail": f"We define Reliability based on Race Classification. Note: Under FIA rules, a driver can be classified (completed 90% distance) even if they retired from the race. Our model tracks unclassified DNFs (NaN positions), which may result in a lower statistical rate than total retirements observed on track."},
-        "overtake": {"driver": overtake_king, "value": total_gained, "detail": f"Overtake King is calculated by subtracting finishing position from grid position for all classified finishes. {overtake_king} gained a net total of {total_gained} positions across the season."},
-        "consistency": {"driver": consistent_driver, "value": consistent_count, "detail": f"Consistency reflects the reliability of performance. {consistent_driver} finished inside the points-paying positions (Top 10) in {consistent_count} separate race sessions."},
-        "weather": {"avg_temp": avg_temp, "rainy": int(df_year[df_year['Rainfall'] > 0]['RaceName'].nunique()), "detail": f"Environmental data is averaged across all sessions. In {year}, {int(df_year[df_year['Rainfall'] > 0]['RaceName'].nunique())} events featured recorded rainfall at the start of the race session."},
-    }
+async def get_year_insights(year: int, if_none_match: Optional[str] = Header(None)):
+    with metrics.endpoint('insights'):
+        with metrics.stage('version_check'):
+            stale = insights_cache.stale()
+        if stale:
+            # Dataset was rewritten: rebuild off the event loop, once for all waiting requests
+            with metrics.stage('rebuild'):
+                await inflight.do(('dataset-sync',), _sync_dataset)
+    if not artifacts.loaded('historical_data'): raise HTTPException(status_code=503, detail="Historical data is still loading")
+    if not len(insights_cache): raise HTTPException(status_code=500, detail="No data")
+    cached = insights_cache.get(year)
+    metrics.CACHE_EVENTS.inc(cache='insights', result='hit' if cached is not None else 'miss')
+    if cached is None: raise HTTPException(status_code=404, detail="No data for year")
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if if_none_match and (if_none_match.strip() == '*' or cached.etag in [t.strip() for t in if_none_match.split(',')]):
+        metrics.CACHE_EVENTS.inc(cache='insights', result='not_modified')
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+def _career_index():
+    if not artifacts.loaded('historical_data'): raise HTTPException(status_code=503, detail="Historical data is still loading")
+    return career_index
+
+@app.get("/drivers/{abbr}")
+async def get_driver(abbr: str):
+    driver = _career_index().driver(abbr.upper())
+    if driver is None: raise HTTPException(status_code=404, detail=f"Unknown driver {abbr!r}")
+    return driver
+
+@app.get("/teams/{name}")
+async def get_team(name: str):
+    team = _career_index().team(name)
+    if team is None: raise HTTPException(status_code=404, detail=f"Unknown team {name!r}")
+    return team
+
+@app.get("/h2h/{a}/{b}")
+async def get_head_to_head(a: str, b: str):
+    h2h = _career_index().h2h(a.upper(), b.upper())
+    if h2h is None: raise HTTPException(status_code=404, detail=f"No head-to-head for {a!r} and {b!r}")
+    return h2h
 
 if __name__ == "__main__":
+    # Development server; for several workers sharing one copy of the artifacts use serve.py
     uvicorn.run("api:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,71 @@
+import threading
+import time
+
+# Named runtime artifacts (model, historical data, ...) loaded in the
+# background, with per-artifact status for /readyz and reload without restart.
+
+
+class NotReady(RuntimeError):
+    """Raised when an artifact is requested before it has loaded."""
+
+
+class Artifacts:
+    def __init__(self):
+        self._loaders = {}
+        self._values = {}
+        self._status = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def register(self, name, loader):
+        """`loader()` returns the artifact value; it is called at load and on every reload."""
+        self._loaders[name] = loader
+        self._status[name] = {"loaded": False, "loading": False, "seconds": None, "loaded_at": None, "error": None}
+
+    def load(self, name):
+        """(Re)load one artifact. The old value stays served until the new one is ready."""
+        with self._lock:
+            self._status[name] = dict(self._status[name], loading=True)
+        start = time.perf_counter()
+        try:
+            value = self._loaders[name]()
+        except Exception as e:
+            print(f"Warning: failed to load {name}: {e!r}")
+            with self._lock:
+                self._status[name] = dict(self._status[name], loading=False, error=repr(e))
+            return False
+        seconds = round(time.perf_counter() - start, 3)
+        with self._lock:
+            self._values[name] = value
+            self._status[name] = {"loaded": True, "loading": False, "seconds": seconds,
+                                  "loaded_at": time.time(), "error": None}
+        print(f"Loaded {name} in {seconds}s.")
+        return True
+
+    def load_all(self, missing_only=False):
+        names = [name for name in self._loaders if not (missing_only and name in self._values)]
+        return all([self.load(name) for name in names])
+
+    def start_background(self, missing_only=False):
+        """Load everything on a daemon thread so the server accepts requests immediately."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self.load_all, args=(missing_only,), name='artifact-loader',
+                                            daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def get(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise NotReady(f"{name} is not loaded yet") from None
+
+    def loaded(self, name):
+        return name in self._values
+
+    def ready(self):
+        return all(name in self._values for name in self._loaders)
+
+    def status(self):
+        with self._lock:
+            return {name: dict(status) for name, status in self._status.items()}
@@ -0,0 +1,150 @@
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+# Load test of the multi-worker launch (serve.py) against the offline replay
+# source. For each worker count: start the server, warm it, drive /predict from
+# `--clients` processes for `--duration` seconds, and report throughput,
+# latency and the proportional memory (PSS) of the whole server process tree.
+#   python benchmarks/load_test.py --workers 1 2 4
+#   python benchmarks/load_test.py --workers 4 --launcher uvicorn   # spawn-style workers, for comparison
+# The response cache is disabled so every request does the real work.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+YEAR = 2023
+ROUNDS = range(2, 23)
+
+
+def _launch(launcher, workers, port):
+    if launcher == 'serve':
+        cmd = [sys.executable, 'serve.py', '--workers', str(workers), '--port', str(port), '--log-level', 'warning']
+    else:
+        cmd = [sys.executable, '-m', 'uvicorn', 'api:app', '--workers', str(workers), '--port', str(port),
+               '--log-level', 'warning']
+    env = dict(os.environ, F1_DATA_SOURCE='replay', F1_RESPONSE_CACHE_MB='0', PYTHONUNBUFFERED='1',
+               F1_DATASET_POLL_SECONDS='3600', F1_MODEL_POLL_SECONDS='3600')
+    log = tempfile.NamedTemporaryFile(prefix=f'load-{launcher}-{workers}-', suffix='.log', delete=False)
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT), log.name
+
+
+def _get(conn, path):
+    conn.request('GET', path)
+    response = conn.getresponse()
+    body = response.read()
+    return response.status, body
+
+
+def _wait_ready(port, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            if _get(conn, '/readyz')[0] == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def _client(args):
+    port, duration, offset = args
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    latencies, errors, i = [], 0, offset
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        path = f"/predict?year={YEAR}&round_num={ROUNDS[i % len(ROUNDS)]}"
+        i += 1
+        start = time.perf_counter()
+        try:
+            status, _ = _get(conn, path)
+        except OSError:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            status = None
+        if status == 200:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors += 1
+    return latencies, errors
+
+
+def _tree(pid):
+    pids = [pid]
+    for p in pids:
+        try:
+            with open(f'/proc/{p}/task/{p}/children') as f:
+                pids.extend(int(c) for c in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def _pss_mb(pid):
+    """Proportional set size of a process and its descendants (Linux), in MB."""
+    total = 0
+    for p in _tree(pid):
+        try:
+            with open(f'/proc/{p}/smaps_rollup') as f:
+                total += sum(int(line.split()[1]) for line in f if line.startswith('Pss:'))
+        except OSError:
+            pass
+    return total / 1024
+
+
+def run(workers, clients, duration, port, launcher):
+    server, log_file = _launch(launcher, workers, port)
+    try:
+        if not _wait_ready(port):
+            raise RuntimeError(f"Server did not become ready; see {log_file}")
+        with Pool(clients) as pool:
+            # Warm-up: every worker sees every round at least once, in all likelihood
+            pool.map(_client, [(port, 2.0, c) for c in range(clients)])
+            start = time.perf_counter()
+            results = pool.map(_client, [(port, duration, c * 7) for c in range(clients)])
+            elapsed = time.perf_counter() - start
+        latencies = sorted(l for ls, _ in results for l in ls)
+        return {
+            "launcher": launcher, "workers": workers, "clients": clients,
+            "requests": len(latencies), "errors": sum(e for _, e in results),
+            "throughput": len(latencies) / elapsed,
+            "p50_ms": statistics.median(latencies) * 1000 if latencies else None,
+            "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None,
+            "pss_mb": _pss_mb(server.pid), "processes": len(_tree(server.pid)),
+        }
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput and memory of the API by worker count.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=None, help="Client processes (default: 2 x max workers)")
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--launcher', choices=['serve', 'uvicorn'], default='serve')
+    parser.add_argument('--output', help="Write the results as JSON")
+    args = parser.parse_args()
+
+    clients = args.clients or 2 * max(args.workers)
+    rows = []
+    print(f"{os.cpu_count()} CPUs, {clients} clients, {args.duration:.0f}s per run, launcher={args.launcher}")
+    for workers in args.workers:
+        row = run(workers, clients, args.duration, args.port, args.launcher)
+        rows.append(row)
+        print(f"workers={workers:<3} {row['throughput']:8.1f} req/s  p50 {row['p50_ms']:7.1f} ms  "
+              f"p95 {row['p95_ms']:7.1f} ms  errors {row['errors']:<4} PSS {row['pss_mb']:7.1f} MB "
+              f"({row['processes']} processes)")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"created_at": time.time(), "cpus": os.cpu_count(), "results": rows}, f, indent=1)
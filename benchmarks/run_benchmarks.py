@@ -0,0 +1,162 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# Offline benchmarks for the API hot paths and the data pipeline.
+#   python benchmarks/run_benchmarks.py --output bench.json
+#   python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json
+# FastF1 is replaced by the offline replay source (data_source.py). With --baseline, exits 1
+# if any case's median is slower than baseline by more than --tolerance.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('F1_DATA_SOURCE', 'replay')
+
+from data_source import ReplaySource  # noqa: E402
+
+EARLY_ROUND, LATE_ROUND, YEAR = 3, 20, 2023
+
+
+def timed(fn, repeat, setup=None):
+    """Run `fn` `repeat` times (calling `setup` untimed before each) and summarize seconds."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {"median": statistics.median(samples), "min": min(samples), "mean": statistics.fmean(samples), "repeat": repeat}
+
+
+def api_cases(repeat, load_latency):
+    import api
+    from fastapi.testclient import TestClient
+    from response_cache import ResponseCache
+    from season_store import SeasonResultsStore
+    from session_cache import SessionCache
+
+    # Dataset rows only, so results don't depend on a local snapshot
+    fixture = ReplaySource(snapshot_dir=None, load_latency=load_latency)
+    store_dir = tempfile.mkdtemp(prefix='bench-season-store-')
+    responses_dir = tempfile.mkdtemp(prefix='bench-responses-')
+    api.artifacts.load_all()
+
+    def no_responses():
+        shutil.rmtree(responses_dir, ignore_errors=True)
+        api.response_cache = ResponseCache(responses_dir)
+
+    def cold():
+        # Empty session cache, season store and response cache: every prior round is loaded again
+        api.sessions = SessionCache(source=fixture)
+        for name in os.listdir(store_dir):
+            os.remove(os.path.join(store_dir, name))
+        api.season_store = SeasonResultsStore(store_dir)
+        no_responses()
+
+    def get(client, url, expect=200):
+        def call():
+            response = client.get(url)
+            assert response.status_code == expect, (url, response.status_code, response.text[:200])
+            assert 'error' not in response.json(), response.text[:200]
+        return call
+
+    results = {}
+    with TestClient(api.app) as client:
+        api.artifacts._thread.join()
+        for label, round_num in (('early', EARLY_ROUND), ('late', LATE_ROUND)):
+            url = f"/predict?year={YEAR}&round_num={round_num}"
+            results[f"predict_cold_{label}"] = timed(get(client, url), repeat, setup=cold)
+            fixture.loads = 0
+            cold()
+            get(client, url)()
+            results[f"predict_cold_{label}"]["session_loads"] = fixture.loads
+            results[f"predict_warm_{label}"] = timed(get(client, url), repeat * 5, setup=no_responses)
+            results[f"predict_cached_{label}"] = timed(get(client, url), repeat * 5)
+        results["insights_year"] = timed(get(client, f"/insights/{YEAR}"), repeat * 20)
+        results["insights_rebuild_all"] = timed(api.insights_cache.refresh, repeat)
+        cold()
+        results["schedule_year_cold"] = timed(get(client, f"/schedule/{YEAR}"), repeat, setup=cold)
+        results["schedule_year_warm"] = timed(get(client, f"/schedule/{YEAR}"), repeat * 20)
+    return results
+
+
+def pipeline_cases(repeat):
+    import dashboard_cube
+    from dataset import load_dataset
+    from race_features import FEATURES
+    from training_data import TARGET, load_training_frame
+    from sklearn.ensemble import RandomForestRegressor
+
+    results = {
+        "dataset_load_training": timed(load_training_frame, repeat),
+        "dataset_load_dashboard": timed(lambda: load_dataset(dashboard_cube.CUBE_COLUMNS), repeat),
+    }
+    cube = dashboard_cube.build_cube(load_dataset(dashboard_cube.CUBE_COLUMNS))
+    years = cube['years'][::2]
+
+    def dashboard_rerun():
+        dashboard_cube.winner_grid_counts(cube, years)
+        dashboard_cube.grid_finish_counts(cube, years)
+        dashboard_cube.team_points_long(cube, years)
+        dashboard_cube.dnf_rates(cube, years)
+    results["dashboard_rerun"] = timed(dashboard_rerun, repeat * 20)
+    df = load_training_frame()
+    X, y = df[FEATURES], df[TARGET]
+    results["model_training"] = timed(
+        lambda: RandomForestRegressor(n_estimators=100, random_state=42, min_samples_leaf=5).fit(X, y), max(1, repeat // 2))
+    return results
+
+
+def compare(current, baseline, tolerance):
+    """Cases whose median regressed by more than `tolerance` (fraction) against the baseline."""
+    regressions = []
+    for name, stats in current['cases'].items():
+        base = baseline.get('cases', {}).get(name)
+        if base and stats['median'] > base['median'] * (1 + tolerance):
+            regressions.append({"case": name, "baseline": base['median'], "current": stats['median'],
+                                "ratio": stats['median'] / base['median']})
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--load-latency', type=float, default=0.0,
+                        help="Seconds each replayed session load sleeps (simulates FastF1 cache reads)")
+    parser.add_argument('--only', choices=['api', 'pipeline'])
+    parser.add_argument('--output', help="Write results JSON here (default: stdout)")
+    parser.add_argument('--baseline', help="Baseline JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    cases = {}
+    if args.only in (None, 'api'):
+        cases.update(api_cases(args.repeat, args.load_latency))
+    if args.only in (None, 'pipeline'):
+        cases.update(pipeline_cases(args.repeat))
+    report = {"created_at": time.time(), "python": platform.python_version(), "machine": platform.machine(),
+              "cpus": os.cpu_count(), "load_latency": args.load_latency, "cases": cases}
+
+    text = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['case']}: {r['baseline']:.4f}s -> {r['current']:.4f}s ({r['ratio']:.2f}x)", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline.", file=sys.stderr)
@@ -1,157 +1,240 @@
-import fastf1
-import pandas as pd
+import argparse
+import json
+import threading
 import time
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from data_source import get_source
+import pandas as pd
+from dataset import DATASET_DIR, ensure_dataset, load_dataset, publish_version, upsert_rows
+from session_cache import SessionCache
+
+# --- 1. Settings ---
+MANIFEST_FILE = 'build_manifest.json'
+YEARS = [2018, 2019, 2020, 2021, 2022, 2023, 2024]
+DEFAULT_WORKERS = 4
+DEFAULT_RATE = 1.0  # session loads started per second, across all workers
+WATCH_INTERVAL = 15 * 60  # seconds between schedule polls in --watch mode
+RESULTS_GRACE = pd.Timedelta(hours=4)  # wait after a race start before expecting classified results
+
+
+class RateLimiter:
+    """Spaces out calls so at most `rate` start per second, shared by all threads."""
 
-print("Starting F1 Dataset Builder...")
-print("This script is resumable.")
-print("It's downloading data for multiple F1 seasons. This may take a while.")
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
 
-# --- 1. Setup Cache ---
-CACHE_DIR = 'cache'
-if not os.path.exists(CACHE_DIR):
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+# --- 2. Manifest (per-round resume state) ---
+def load_manifest(manifest_file=MANIFEST_FILE, dataset_dir=DATASET_DIR):
+    """Completed rounds as {year: set(rounds)}.
+
+    Without a manifest, it is bootstrapped from the rounds already in the dataset.
+    """
+    if os.path.exists(manifest_file):
+        with open(manifest_file) as f:
+            data = json.load(f)
+        return {int(y): set(rounds) for y, rounds in data.get('completed', {}).items()}
+    completed = {}
     try:
-        os.makedirs(CACHE_DIR)
-        print(f"Cache directory '{CACHE_DIR}' created.")
-    except Exception as e:
-        print(f"Error creating cache directory: {e}")
-        pass
-
-try:
-    fastf1.Cache.enable_cache(CACHE_DIR)
-    print(f"FastF1 cache enabled at: ./{CACHE_DIR}")
-except Exception as e:
-    print(f"Could not enable cache: {e}. Make sure the 'cache' folder exists.")
-    exit()
-
-# --- 2. Setup Output File and Resume Logic ---
-OUTPUT_FILE = 'f1_race_data_2018_2024.csv'
-YEARS = [2018, 2019, 2020, 2021, 2022, 2023, 2024]
-START_YEAR = YEARS[0]
-START_ROUND = 1
+        df_existing = load_dataset(['Year', 'RoundNumber'], root=dataset_dir)
+        for (y, r), _ in df_existing.groupby(['Year', 'RoundNumber']):
+            completed.setdefault(int(y), set()).add(int(r))
+        print(f"Bootstrapped manifest from {dataset_dir}/: {sum(len(r) for r in completed.values())} rounds.")
+    except FileNotFoundError:
+        print(f"No dataset found at {dataset_dir}/. Starting from scratch.")
+    return completed
+
+
+def save_manifest(completed, manifest_file=MANIFEST_FILE):
+    # Write-then-rename so an interrupted run never leaves a corrupt manifest
+    tmp_file = f"{manifest_file}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump({'completed': {str(y): sorted(r) for y, r in sorted(completed.items())}}, f, indent=1)
+    os.replace(tmp_file, manifest_file)
+
+
+# --- 3. Fetching ---
+def race_start(event):
+    """UTC race start from a schedule row (FastF1 Session5DateUtc), else the end of EventDate."""
+    start = event.get('Session5DateUtc')
+    if start is not None and pd.notna(start):
+        start = pd.Timestamp(start)
+        return start.tz_convert(None) if start.tzinfo else start
+    return pd.Timestamp(event['EventDate']).normalize() + pd.Timedelta(days=1)
+
+
+def pending_rounds(years, completed, limiter, sessions, until=None):
+    """(year, round, event name) for every race not yet in the manifest.
+
+    With `until`, races starting after it are skipped (not run yet).
+    """
+    pending = []
+    for year in years:
+        limiter.wait()
+        races = sessions.schedule(year)
+        done = completed.get(year, set())
+        for _, event in races.iterrows():
+            round_number = int(event['RoundNumber'])
+            if round_number in done:
+                continue
+            if until is not None and race_start(event) > until:
+                continue
+            pending.append((year, round_number, event['EventName']))
+    return pending
+
+
+def weather_gaps(years, dataset_dir=DATASET_DIR):
+    """(year, round, event name) for every stored race without weather-window features.
 
-# Check if the output file already exists to resume
-if os.path.exists(OUTPUT_FILE):
+    Rounds imported from the legacy CSV have none; the manifest counts them as
+    complete, so only a backfill fetches them again.
+    """
     try:
-        print(f"Found existing data file: {OUTPUT_FILE}")
-        df_existing = pd.read_csv(OUTPUT_FILE)
-        
-        if not df_existing.empty:
-            # Find the last successfully processed race
-            last_entry = df_existing.iloc[-1]
-            last_year = int(last_entry['Year'])
-            last_round = int(last_entry['RoundNumber'])
-            
-            print(f"Last saved race: {last_year}, Round {last_round}")
-            
-            # Get schedule to see if it was the last race of the season
-            schedule_last_year = fastf1.get_event_schedule(last_year)
-            races_last_year = schedule_last_year[schedule_last_year['EventFormat'] != 'testing']
-            
-            if last_round == races_last_year['RoundNumber'].max():
-                # It was the last race, start from the next year
-                START_YEAR = last_year + 1
-                START_ROUND = 1
-                print(f"Resuming from {START_YEAR}, Round {START_ROUND}")
-            else:
-                # Start from the next round in the same year
-                START_YEAR = last_year
-                START_ROUND = last_round + 1
-                print(f"Resuming from {START_YEAR}, Round {START_ROUND}")
-        else:
-             print("Data file is empty. Starting from scratch.")
-             
-    except Exception as e:
-        print(f"Error reading {OUTPUT_FILE}: {e}. Starting from scratch.")
-        START_YEAR = YEARS[0]
-        START_ROUND = 1
-else:
-    print(f"No data file found. Creating {OUTPUT_FILE} and starting from scratch.")
-    # Create an empty file with headers to make it appendable
-    # We need to know the columns. We'll get them by loading one session first.
-    pass # We will handle header writing on the first loop
-
-
-# --- 3. Main Data Collection Loop ---
-print(f"Collecting data for seasons: {YEARS}")
-
-for year in YEARS:
-    if year < START_YEAR:
-        print(f"\n--- Skipping Year {year} (already processed) ---")
-        continue
-        
-    print(f"\n--- Processing Year: {year} ---")
-    
-    # Get the event schedule for the year
-    schedule = fastf1.get_event_schedule(year)
-    
-    # Filter out testing events
-    races = schedule[schedule['EventFormat'] != 'testing']
-    
-    # Loop through each race event
-    for _, event in races.iterrows():
-        event_name = event['EventName']
-        round_number = event['RoundNumber']
-        
-        if year == START_YEAR and round_number < START_ROUND:
-            print(f"Skipping: {year} {event_name} (Round {round_number}) (already processed)")
-            continue
-        
-        print(f"Processing: {year} {event_name} (Round {round_number})")
-        
-        try:
-            # Get the race session
-            session = fastf1.get_session(year, round_number, 'R')
-            
-            # Load the session data (results and weather)
-            session.load(weather=True, telemetry=False, messages=False)
-            
-            # Check if we got results
-            if session.results is None or session.results.empty:
+        df = load_dataset(['Year', 'RoundNumber', 'RaceName', 'TrackTempMean'], years=years, root=dataset_dir)
+    except FileNotFoundError:
+        return []
+    gaps = df[df['TrackTempMean'].isna()].drop_duplicates(['Year', 'RoundNumber'])
+    return [(int(y), int(r), name) for y, r, name in gaps[['Year', 'RoundNumber', 'RaceName']].itertuples(index=False)]
+
+
+def fetch_round(year, round_number, event_name, limiter, sessions):
+    """Load one race session and return its results with weather and identifiers attached."""
+    limiter.wait()
+    session = sessions.session(year, round_number)
+
+    if session.results is None or session.results.empty:
+        return None
+
+    results = session.results.copy()
+    # Weather at the start of the race
+    weather = session.weather_data.iloc[0]
+    results['Year'] = year
+    results['RaceName'] = event_name
+    results['RoundNumber'] = round_number
+    results['AirTemp'] = weather['AirTemp']
+    results['TrackTemp'] = weather['TrackTemp']
+    results['Humidity'] = weather['Humidity']
+    results['Rainfall'] = weather['Rainfall']
+    # Reduction of the full weather series, computed when the session was loaded
+    for name, value in session.weather_window.items():
+        results[name] = value
+    return results
+
+
+def build(years=YEARS, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+          dataset_dir=DATASET_DIR, manifest_file=MANIFEST_FILE,
+          source=None, until=None, backfill_weather=False):
+    """Fetch every race of `years` missing from the manifest and upsert it into the dataset.
+
+    With `backfill_weather`, fetch the stored races without weather-window
+    features instead (see weather_gaps).
+    The rounds written are published as one new dataset version (see dataset.publish_version).
+    """
+    # Import the legacy CSV before the first upsert creates any partition
+    ensure_dataset(dataset_dir)
+    completed = load_manifest(manifest_file, dataset_dir)
+    limiter = RateLimiter(rate)
+    # Each session is fetched once here, so keep the in-memory cache small
+    sessions = SessionCache(max_bytes=64 * 1024 * 1024, source=source)
+    if backfill_weather:
+        todo = weather_gaps(years, dataset_dir)
+    else:
+        todo = pending_rounds(years, completed, limiter, sessions, until)
+    if todo or until is None:
+        print(f"{len(todo)} rounds to fetch with {workers} workers.")
+
+    saved = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch_round, y, r, name, limiter, sessions): (y, r, name) for y, r, name in todo}
+        # Results are written from this thread only, so the dataset and manifest never race
+        for future in as_completed(futures):
+            year, round_number, event_name = futures[future]
+            try:
+                results = future.result()
+            except Exception as e:
+                print(f"!! ERROR loading session for {year} {event_name}: {e}")
+                print("This might be a cancelled session or a data loading issue. Will retry on the next run.")
+                continue
+            if results is None:
                 print(f"No results found for {year} {event_name}. Skipping.")
                 continue
-                
-            # Get race results
-            results = session.results
-            
-            # Get weather data (we'll take the weather at the start of the race)
-            weather = session.weather_data.iloc[0] # First row
-            
-            # Add weather data and identifiers to each driver's result
-            results['Year'] = year
-            results['RaceName'] = event_name
-            results['RoundNumber'] = round_number
-            results['AirTemp'] = weather['AirTemp']
-            results['TrackTemp'] = weather['TrackTemp']
-            results['Humidity'] = weather['Humidity']
-            results['Rainfall'] = weather['Rainfall']
-            
-            # --- Append data to CSV ---
-            # Check if file exists to decide whether to write headers
-            file_exists = os.path.exists(OUTPUT_FILE)
-            
-            results.to_csv(OUTPUT_FILE, mode='a', header=not file_exists, index=False)
-            
-            print(f"Successfully processed and saved {year} {event_name}")
-            
+            if backfill_weather and results['TrackTempMean'].isna().all():
+                print(f"No race-window weather for {year} {event_name}. Skipping.")
+                continue
+            upsert_rows(results, dataset_dir)
+            completed.setdefault(year, set()).add(round_number)
+            save_manifest(completed, manifest_file)
+            saved.append((year, round_number))
+            print(f"Successfully processed and saved {year} {event_name} (Round {round_number})")
+    if saved:
+        version = publish_version(saved, dataset_dir)
+        print(f"Published dataset version {version} ({len(saved)} rounds).")
+    return len(saved)
+
+
+def watch(years=None, interval=WATCH_INTERVAL, grace=RESULTS_GRACE, once=False, **build_args):
+    """Poll the schedule and ingest rounds as they finish, until interrupted.
+
+    Without `years`, follows the current season (and the previous one in January,
+    when its last round may still be pending).
+    """
+    while True:
+        now = pd.Timestamp.now(tz='UTC').tz_localize(None)
+        poll_years = years or sorted({now.year, (now - pd.Timedelta(days=31)).year})
+        try:
+            saved = build(poll_years, until=now - grace, **build_args)
+            if saved:
+                print(f"[{now:%Y-%m-%d %H:%M}] Ingested {saved} new rounds.")
         except Exception as e:
-            print(f"!! ERROR loading session for {year} {event_name}: {e}")
-            print("This might be a cancelled session or a data loading issue. Skipping.")
-        
-        # Be nice to the API
-        time.sleep(1) # Wait 1 second between API calls
-
-print("\n--- Data collection complete ---")
-
-try:
-    final_dataset = pd.read_csv(OUTPUT_FILE)
-    print(f"Total rows collected in {OUTPUT_FILE}: {len(final_dataset)}")
-    # De-duplicate, just in case
-    final_dataset.drop_duplicates(subset=['Year', 'RoundNumber', 'Abbreviation'], inplace=True)
-    final_dataset.to_csv(OUTPUT_FILE, index=False)
-    print(f"De-duplicated. Final row count: {len(final_dataset)}")
-except Exception as e:
-    print(f"Could not read final dataset for a count: {e}")
-
-
-print("\nNext step: Run `train_model.py` to build the model!")
\ No newline at end of file
+            # A failed poll (network, schedule not published yet) is retried next time
+            print(f"!! Poll failed: {e}")
+        if once:
+            return
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the F1 race dataset (resumable).")
+    parser.add_argument('--years', type=int, nargs='+', help=f"Seasons to collect (default: {YEARS[0]}-{YEARS[-1]}; with --watch, the live season)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Parallel session loads")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="Max session loads started per second (0 = unlimited)")
+    parser.add_argument('--source', choices=['fastf1', 'replay'], help="Data source (default: $F1_DATA_SOURCE or fastf1)")
+    parser.add_argument('--watch', action='store_true', help="Keep running and ingest rounds as they finish")
+    parser.add_argument('--interval', type=float, default=WATCH_INTERVAL, help="Seconds between polls in --watch mode")
+    parser.add_argument('--backfill-weather', action='store_true',
+                        help="Re-fetch stored rounds without weather-window features (e.g. imported from the CSV)")
+    args = parser.parse_args()
+
+    print("Starting F1 Dataset Builder...")
+    print("This script is resumable: completed rounds are tracked in", MANIFEST_FILE)
+    source = get_source(args.source)
+    print(f"Reading sessions from the '{source.name}' source")
+
+    if args.backfill_weather:
+        years = args.years or YEARS
+        print(f"Backfilling race-window weather for seasons: {years}")
+        build(years, workers=args.workers, rate=args.rate, source=source, backfill_weather=True)
+    elif args.watch:
+        # Explicit --years are followed as given; otherwise the live season
+        print(f"Watching for completed rounds every {args.interval:.0f}s (Ctrl+C to stop)")
+        watch(args.years, args.interval, workers=args.workers, rate=args.rate, source=source)
+    else:
+        years = args.years or YEARS
+        print(f"Collecting data for seasons: {years}")
+        build(years, workers=args.workers, rate=args.rate, source=source)
+
+        print("\n--- Data collection complete ---")
+        print("\nNext step: Run `train_model.py` to build the model!")
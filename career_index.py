@@ -0,0 +1,226 @@
+import threading
+import numpy as np
+import pandas as pd
+
+# In-memory career and head-to-head index behind /drivers/{abbr}, /teams/{name}
+# and /h2h/{a}/{b}. Drivers and teams get integer ids; aggregates live in NumPy
+# arrays indexed by id, and head-to-head counts in (driver x driver) matrices.
+# Rounds are folded in one at a time, so appending a race is incremental.
+
+DRIVER_STATS = ['starts', 'wins', 'podiums', 'points', 'poles', 'dnfs', 'finishes', 'finish_sum', 'grid_sum',
+                'best_finish', 'first_year', 'last_year']
+TEAM_STATS = ['entries', 'wins', 'podiums', 'points', 'dnfs', 'first_year', 'last_year']
+# Per ordered pair (i, j), over the races both started
+H2H_STATS = ['races', 'finished_ahead', 'points_diff', 'grid_ahead', 'grid_diff']
+INITIAL_CAPACITY = 64
+
+
+class CareerIndex:
+    def __init__(self):
+        self.driver_ids = {}
+        self.team_ids = {}
+        self.driver_names = []
+        self.driver_teams = []
+        self._rounds = {}  # (year, round) -> rows indexed, to detect corrected results
+        self._lock = threading.Lock()          # guards the arrays for readers
+        self._write_lock = threading.RLock()   # serializes updates and rebuilds
+        self._drivers = self._table(DRIVER_STATS, INITIAL_CAPACITY)
+        self._teams = self._table(TEAM_STATS, INITIAL_CAPACITY)
+        self._h2h = {name: np.zeros((INITIAL_CAPACITY, INITIAL_CAPACITY)) for name in H2H_STATS}
+
+    @staticmethod
+    def _table(columns, capacity):
+        table = {name: np.zeros(capacity) for name in columns}
+        for name in ('best_finish', 'first_year'):
+            if name in table:
+                table[name][:] = np.inf
+        return table
+
+    @staticmethod
+    def _grow_table(table, capacity):
+        for name, values in table.items():
+            grown = np.full(capacity, np.inf if name in ('best_finish', 'first_year') else 0.0)
+            grown[:len(values)] = values
+            table[name] = grown
+
+    def _ids(self, keys, mapping, table, grow_h2h=False):
+        # Caller holds self._lock
+        for key in keys:
+            if key not in mapping:
+                mapping[key] = len(mapping)
+                if mapping is self.driver_ids:
+                    self.driver_names.append(None)
+                    self.driver_teams.append([])
+        capacity = len(next(iter(table.values())))
+        if len(mapping) > capacity:
+            capacity = max(capacity * 2, len(mapping))
+            self._grow_table(table, capacity)
+            if grow_h2h:
+                for name, matrix in self._h2h.items():
+                    grown = np.zeros((capacity, capacity))
+                    grown[:len(matrix), :len(matrix)] = matrix
+                    self._h2h[name] = grown
+        return np.array([mapping[k] for k in keys], dtype=np.int64)
+
+    # --- Updates ---
+    ROUND_COLUMNS = ['Abbreviation', 'FullName', 'TeamName', 'GridPosition', 'Position', 'Points']
+
+    @classmethod
+    def _round_rows(cls, rows):
+        rows = rows.dropna(subset=['Abbreviation']).drop_duplicates('Abbreviation')
+        return rows[[c for c in cls.ROUND_COLUMNS if c in rows.columns]].reset_index(drop=True)
+
+    def add_round(self, year, round_number, rows):
+        """Fold one race into the index.
+
+        A round already indexed with the same results is ignored; one with different
+        results (penalties, reclassification) replaces the earlier version.
+        """
+        key = (int(year), int(round_number))
+        rows = self._round_rows(rows)
+        if rows.empty:
+            return False
+        with self._write_lock:
+            previous = self._rounds.get(key)
+            if previous is not None:
+                if previous.equals(rows):
+                    return False
+                # Min/max aggregates can't be subtracted: re-index every round with the corrected one
+                rounds = dict(self._rounds)
+                rounds[key] = rows
+                self._swap(self._indexed(rounds))
+                return True
+            with self._lock:
+                self._fold(key, rows)
+        return True
+
+    @classmethod
+    def _indexed(cls, rounds):
+        """New index of `rounds` ({(year, round): rows}), oldest first."""
+        index = cls()
+        for key in sorted(rounds):
+            index._fold(key, rounds[key])
+        return index
+
+    def _swap(self, other):
+        # Readers see either the old or the new state, never a partial rebuild
+        with self._lock:
+            for name in ('driver_ids', 'team_ids', 'driver_names', 'driver_teams', '_rounds',
+                         '_drivers', '_teams', '_h2h'):
+                setattr(self, name, getattr(other, name))
+
+    def _fold(self, key, rows):
+        # Caller holds self._lock (or owns a fresh index)
+        self._rounds[key] = rows
+        year = float(key[0])
+        abbrs = rows['Abbreviation'].astype(str).tolist()
+        teams = rows['TeamName'].astype(str).tolist()
+        d = self._ids(abbrs, self.driver_ids, self._drivers, grow_h2h=True)
+        t = self._ids(teams, self.team_ids, self._teams)
+        pos = pd.to_numeric(rows['Position'], errors='coerce').to_numpy(dtype=float)
+        grid = pd.to_numeric(rows['GridPosition'], errors='coerce').to_numpy(dtype=float)
+        grid = np.where((grid > 0) & ~np.isnan(grid), grid, 20.0)  # pit-lane starts count as last
+        points = pd.to_numeric(rows['Points'], errors='coerce').fillna(0).to_numpy(dtype=float)
+        finished = ~np.isnan(pos)
+
+        s = self._drivers
+        s['starts'][d] += 1
+        s['wins'][d] += pos == 1
+        s['podiums'][d] += pos <= 3
+        s['points'][d] += points
+        s['poles'][d] += grid == 1
+        s['dnfs'][d] += ~finished
+        s['finishes'][d] += finished
+        s['finish_sum'][d] += np.where(finished, pos, 0)
+        s['grid_sum'][d] += grid
+        s['best_finish'][d] = np.fmin(s['best_finish'][d], np.where(finished, pos, np.inf))
+        s['first_year'][d] = np.minimum(s['first_year'][d], year)
+        s['last_year'][d] = np.maximum(s['last_year'][d], year)
+
+        ts = self._teams
+        np.add.at(ts['entries'], t, 1)
+        np.add.at(ts['wins'], t, pos == 1)
+        np.add.at(ts['podiums'], t, pos <= 3)
+        np.add.at(ts['points'], t, points)
+        np.add.at(ts['dnfs'], t, ~finished)
+        ts['first_year'][t] = np.minimum(ts['first_year'][t], year)
+        ts['last_year'][t] = np.maximum(ts['last_year'][t], year)
+
+        # Every ordered pair of this race at once; unclassified drivers finish behind classified ones
+        effective = np.where(finished, pos, np.inf)
+        rows_ix, cols_ix = np.ix_(d, d)
+        both = 1.0 - np.eye(len(d))
+        h = self._h2h
+        h['races'][rows_ix, cols_ix] += both
+        h['finished_ahead'][rows_ix, cols_ix] += effective[:, None] < effective[None, :]
+        h['points_diff'][rows_ix, cols_ix] += points[:, None] - points[None, :]
+        h['grid_ahead'][rows_ix, cols_ix] += grid[:, None] < grid[None, :]
+        h['grid_diff'][rows_ix, cols_ix] += grid[:, None] - grid[None, :]
+
+        for i, team, row_name in zip(d, teams, rows['FullName'] if 'FullName' in rows else [None] * len(d)):
+            if pd.notna(row_name):
+                self.driver_names[i] = str(row_name)
+            if team not in self.driver_teams[i]:
+                self.driver_teams[i].append(team)
+
+    def build(self, df):
+        """Rebuild the index from every round of `df` (dataset or season-store rows). Returns rounds indexed."""
+        df = df.sort_values(['Year', 'RoundNumber'], kind='stable')
+        rounds = {}
+        for (year, round_number), rows in df.groupby(['Year', 'RoundNumber'], sort=True):
+            rows = self._round_rows(rows)
+            if not rows.empty:
+                rounds[(int(year), int(round_number))] = rows
+        with self._write_lock:
+            self._swap(self._indexed(rounds))
+        return len(rounds)
+
+    # --- Lookups ---
+    def __len__(self):
+        return len(self._rounds)
+
+    def driver(self, abbr):
+        """Career aggregates of one driver, or None if unknown."""
+        with self._lock:
+            i = self.driver_ids.get(abbr)
+            if i is None:
+                return None
+            s = {name: float(values[i]) for name, values in self._drivers.items()}
+            name, teams = self.driver_names[i], list(self.driver_teams[i])
+        return {
+            "abbreviation": abbr, "name": name, "teams": teams,
+            "seasons": [int(s['first_year']), int(s['last_year'])],
+            "starts": int(s['starts']), "wins": int(s['wins']), "podiums": int(s['podiums']),
+            "poles": int(s['poles']), "dnfs": int(s['dnfs']), "points": s['points'],
+            "best_finish": int(s['best_finish']) if np.isfinite(s['best_finish']) else None,
+            "avg_finish": round(s['finish_sum'] / s['finishes'], 2) if s['finishes'] else None,
+            "avg_grid": round(s['grid_sum'] / s['starts'], 2) if s['starts'] else None,
+        }
+
+    def team(self, name):
+        """Aggregates of one team (by name as it appears in the results), or None."""
+        with self._lock:
+            i = self.team_ids.get(name)
+            if i is None:
+                return None
+            s = {key: float(values[i]) for key, values in self._teams.items()}
+        return {"team": name, "seasons": [int(s['first_year']), int(s['last_year'])],
+                "entries": int(s['entries']), "wins": int(s['wins']), "podiums": int(s['podiums']),
+                "dnfs": int(s['dnfs']), "points": s['points']}
+
+    def h2h(self, a, b):
+        """Head-to-head of drivers `a` and `b` over the races they both started, or None."""
+        with self._lock:
+            i, j = self.driver_ids.get(a), self.driver_ids.get(b)
+            if i is None or j is None or i == j:
+                return None
+            h = {name: float(matrix[i, j]) for name, matrix in self._h2h.items()}
+            b_ahead, b_grid_ahead = float(self._h2h['finished_ahead'][j, i]), float(self._h2h['grid_ahead'][j, i])
+        races = int(h['races'])
+        return {
+            "drivers": [a, b], "races": races,
+            "finished_ahead": {a: int(h['finished_ahead']), b: int(b_ahead)},
+            "qualified_ahead": {a: int(h['grid_ahead']), b: int(b_grid_ahead)},
+            "points_delta": h['points_diff'],
+            "avg_grid_delta": round(h['grid_diff'] / races, 2) if races else None,
+        }
@@ -0,0 +1,165 @@
+import json
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+
+# Array-backed export of a fitted sklearn forest regressor.
+# All trees are flattened into one set of node arrays saved as .npy files,
+# which load with mmap (no unpickling, pages shared between processes).
+# CompactForest scores every sample through every tree at once in NumPy.
+# Missing values (NaN) follow each node's learned direction, as in sklearn.
+
+COMPACT_MODEL_DIR = 'f1_prediction_model.forest'
+ARRAYS = ['feature', 'threshold', 'left', 'right', 'value', 'roots', 'missing_left']
+
+
+def _float32_floor(threshold):
+    """Largest float32 <= threshold, so `x32 <= t32` matches sklearn's `x32 <= t64` exactly."""
+    t32 = threshold.astype(np.float32)
+    too_high = t32.astype(np.float64) > threshold
+    t32[too_high] = np.nextafter(t32[too_high], np.float32(-np.inf))
+    return t32
+
+
+def export_forest(model, path=COMPACT_MODEL_DIR, feature_names=None):
+    """Flatten a fitted RandomForestRegressor (single output) into `path`."""
+    feature, threshold, left, right, value, roots, missing_left = [], [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n = tree.node_count
+        is_leaf = tree.children_left == -1
+        own = np.arange(offset, offset + n, dtype=np.int32)
+        # Leaves point to themselves, so traversal needs no leaf test
+        left.append(np.where(is_leaf, own, tree.children_left + offset).astype(np.int32))
+        right.append(np.where(is_leaf, own, tree.children_right + offset).astype(np.int32))
+        feature.append(np.where(is_leaf, 0, tree.feature).astype(np.int16))
+        threshold.append(np.where(is_leaf, np.inf, _float32_floor(tree.threshold)).astype(np.float32))
+        value.append(tree.value[:, 0, 0].astype(np.float32))
+        missing_left.append(np.asarray(getattr(tree, 'missing_go_to_left', np.zeros(n)), dtype=bool))
+        roots.append(offset)
+        offset += n
+        max_depth = max(max_depth, tree.max_depth)
+
+    os.makedirs(path, exist_ok=True)
+    arrays = dict(feature=np.concatenate(feature), threshold=np.concatenate(threshold),
+                  left=np.concatenate(left), right=np.concatenate(right),
+                  value=np.concatenate(value), roots=np.asarray(roots, dtype=np.int32),
+                  missing_left=np.concatenate(missing_left))
+    for name, arr in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), arr)
+    if feature_names is None and hasattr(model, 'feature_names_in_'):
+        feature_names = list(model.feature_names_in_)
+    meta = {"n_trees": len(roots), "n_nodes": int(offset), "max_depth": int(max_depth),
+            "n_features": int(model.n_features_in_), "features": feature_names}
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=1)
+    return meta
+
+
+class CompactForest:
+    """Vectorized predictor over exported node arrays. Drop-in for `model.predict`."""
+
+    def __init__(self, arrays, meta):
+        for name in ARRAYS:
+            setattr(self, name, arrays.get(name))
+        self.meta = meta
+        self.max_depth = meta['max_depth']
+        self.features = meta.get('features')
+        self.n_features_in_ = meta['n_features']
+
+    @classmethod
+    def load(cls, path=COMPACT_MODEL_DIR, mmap=True):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        # Exports made before missing_left existed can only score complete rows (see _matrix)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None)
+                  for name in ARRAYS if os.path.exists(os.path.join(path, f"{name}.npy"))}
+        return cls(arrays, meta)
+
+    def _matrix(self, X):
+        if hasattr(X, 'columns'):
+            X = X[self.features] if self.features else X
+            X = X.to_numpy()
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if self.missing_left is None and np.isnan(X).any():
+            raise ValueError("Input contains NaN and this export has no missing-value routing; re-export the model")
+        return X
+
+    def predict_per_tree(self, X):
+        """Leaf value of every tree for every sample, shape (n_samples, n_trees)."""
+        X = self._matrix(X)
+        has_nan = self.missing_left is not None and np.isnan(X).any()
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[node]]
+            go_left = x <= self.threshold[node]
+            if has_nan:
+                go_left = np.where(np.isnan(x), self.missing_left[node], go_left)
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node]
+
+    def predict(self, X):
+        return self.predict_per_tree(X).mean(axis=1, dtype=np.float64)
+
+
+# --- Benchmark: compact export vs joblib pickle ---
+_LOAD_SNIPPET = """
+import resource, time, sys
+t = time.perf_counter()
+if sys.argv[1] == 'compact':
+    from compact_forest import CompactForest
+    m = CompactForest.load(sys.argv[2])
+else:
+    import joblib
+    m = joblib.load(sys.argv[2])
+elapsed = time.perf_counter() - t
+try:
+    # Peak RSS of this process image; ru_maxrss would carry over the parent's peak across exec
+    rss = next(int(l.split()[1]) for l in open('/proc/self/status') if l.startswith('VmHWM:'))
+except OSError:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(elapsed, rss)
+"""
+
+
+def _measure_load(kind, path):
+    # Fresh interpreter per measurement so imports and page cache state are comparable
+    out = subprocess.run([sys.executable, '-c', _LOAD_SNIPPET, kind, path], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.split()
+    return float(out[0]), int(out[1])
+
+
+def benchmark(joblib_path='f1_prediction_model.joblib', compact_path=COMPACT_MODEL_DIR, X=None):
+    import joblib
+    model = joblib.load(joblib_path)
+    compact = CompactForest.load(compact_path)
+    if X is None:
+        rng = np.random.default_rng(0)
+        X = rng.uniform(0, 40, size=(2000, model.n_features_in_))
+    X = np.asarray(X, dtype=np.float64)
+
+    t = time.perf_counter(); expected = model.predict(X); sk_time = time.perf_counter() - t
+    t = time.perf_counter(); got = compact.predict(X); compact_time = time.perf_counter() - t
+    sk_load, sk_rss = _measure_load('joblib', joblib_path)
+    c_load, c_rss = _measure_load('compact', compact_path)
+    return {
+        "max_abs_diff": float(np.abs(expected - got).max()),
+        "predict_seconds": {"joblib": sk_time, "compact": compact_time},
+        "load_seconds": {"joblib": sk_load, "compact": c_load},
+        "max_rss_kb": {"joblib": sk_rss, "compact": c_rss},
+        "disk_bytes": {"joblib": os.path.getsize(joblib_path),
+                       "compact": sum(os.path.getsize(os.path.join(compact_path, f)) for f in os.listdir(compact_path))},
+    }
+
+
+if __name__ == "__main__":
+    import joblib
+    print("Exporting f1_prediction_model.joblib to", COMPACT_MODEL_DIR)
+    from race_features import FEATURES
+    meta = export_forest(joblib.load('f1_prediction_model.joblib'), COMPACT_MODEL_DIR, FEATURES)
+    print(f"{meta['n_trees']} trees, {meta['n_nodes']} nodes, max depth {meta['max_depth']}")
+    print(json.dumps(benchmark(), indent=1))
@@ -0,0 +1,39 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Keeps blocking FastF1 / pandas / model work off the event loop.
+# Everything slow runs on one bounded thread pool, and identical concurrent
+# requests share a single in-flight call.
+
+BLOCKING_WORKERS = int(os.environ.get('F1_BLOCKING_WORKERS', '4'))
+_executor = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix='f1-blocking')
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking callable on the shared executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one blocking execution.
+
+    Only used from the event loop thread, so the in-flight dict needs no lock.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+
+    def __len__(self):
+        return len(self._inflight)
+
+    async def do(self, key, fn, *args, **kwargs):
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(run_blocking(fn, *args, **kwargs))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # A disconnecting client must not cancel the load other callers are waiting on
+        return await asyncio.shield(future)
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+# Per-season aggregates behind analysis_app.py. Built once from the dataset;
+# any selection of seasons is answered by summing the rows of a few small
+# arrays instead of re-filtering and re-grouping the full frame.
+
+CUBE_COLUMNS = ['Year', 'TeamName', 'GridPosition', 'Position', 'Points', 'Rainfall']
+MAX_GRID = 24      # winner grid histogram bins 0..MAX_GRID (0 = pit lane start)
+HEATMAP_SIZE = 20  # grid/finish positions 1..20; pit-lane starts and P20+ fold into 20
+
+
+def build_cube(df):
+    """Aggregate dataset rows into per-year arrays (first axis aligned with `years`)."""
+    years = np.array(sorted(df['Year'].unique()), dtype=np.int64)
+    year_ix = np.searchsorted(years, df['Year'].to_numpy())
+    n_years = len(years)
+    position = df['Position'].to_numpy(dtype=float)
+    grid = df['GridPosition'].to_numpy(dtype=float)
+    finished = ~np.isnan(position)
+
+    teams, team_ix = np.unique(df['TeamName'].astype(str).to_numpy(), return_inverse=True)
+    team_points = np.zeros((n_years, len(teams)))
+    np.add.at(team_points, (year_ix, team_ix), np.nan_to_num(df['Points'].to_numpy(dtype=float)))
+
+    won = position == 1
+    win_grid = np.zeros((n_years, MAX_GRID + 1), dtype=np.int64)
+    np.add.at(win_grid, (year_ix[won], np.clip(np.nan_to_num(grid[won]), 0, MAX_GRID).astype(int)), 1)
+
+    placed = finished & ~np.isnan(grid)
+    g = np.where(grid[placed] == 0, HEATMAP_SIZE, grid[placed])
+    grid_finish = np.zeros((n_years, HEATMAP_SIZE, HEATMAP_SIZE), dtype=np.int64)
+    np.add.at(grid_finish, (year_ix[placed],
+                            np.clip(g, 1, HEATMAP_SIZE).astype(int) - 1,
+                            np.clip(position[placed], 1, HEATMAP_SIZE).astype(int) - 1), 1)
+
+    # Column 0 = dry, 1 = wet
+    wet = df['Rainfall'].fillna(False).astype(bool).to_numpy().astype(int)
+    entries = np.zeros((n_years, 2), dtype=np.int64)
+    dnfs = np.zeros((n_years, 2), dtype=np.int64)
+    np.add.at(entries, (year_ix, wet), 1)
+    np.add.at(dnfs, (year_ix, wet), ~finished)
+
+    return {"years": years, "teams": teams, "team_points": team_points, "win_grid": win_grid,
+            "grid_finish": grid_finish, "entries": entries, "dnfs": dnfs}
+
+
+def _mask(cube, years):
+    return np.isin(cube['years'], np.asarray(list(years), dtype=np.int64))
+
+
+def winner_grid_counts(cube, years):
+    counts = cube['win_grid'][_mask(cube, years)].sum(axis=0)
+    nonzero = np.flatnonzero(counts)
+    return pd.DataFrame({'Grid Position': nonzero, 'Wins': counts[nonzero]})
+
+
+def grid_finish_counts(cube, years):
+    """(grid, finish) counts, rows = grid position 1..20, columns = finish position 1..20."""
+    return cube['grid_finish'][_mask(cube, years)].sum(axis=0)
+
+
+def team_points_long(cube, years):
+    mask = _mask(cube, years)
+    points = cube['team_points'][mask]
+    y, t = np.nonzero(points)
+    return pd.DataFrame({'Year': cube['years'][mask][y], 'TeamName': cube['teams'][t], 'Points': points[y, t]})
+
+
+def dnf_rates(cube, years):
+    """DNF rate (%) in dry and wet races; NaN when there were no such races."""
+    mask = _mask(cube, years)
+    entries, dnfs = cube['entries'][mask].sum(axis=0), cube['dnfs'][mask].sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rates = dnfs / entries * 100
+    return pd.DataFrame({'Condition': ['Dry', 'Wet'], 'DNF Rate (%)': rates})
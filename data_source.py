@@ -0,0 +1,182 @@
+import argparse
+import os
+import threading
+import time
+import pandas as pd
+from dataset import DATASET_DIR, load_dataset
+from weather_features import WEATHER_WINDOW_FEATURES
+
+# Where schedules and race sessions come from. Both backends expose the two
+# FastF1 calls the app uses: get_event_schedule(year, include_testing) and
+# get_session(year, round, kind) -> session with .load(), .results,
+# .weather_data and .event.
+#   fastf1  live FastF1 with its on-disk cache (default)
+#   replay  no network: a snapshot directory recorded from FastF1, falling
+#           back to the historical dataset (results + start-of-race weather)
+# Pick one with F1_DATA_SOURCE=fastf1|replay; F1_REPLAY_DIR sets the snapshot.
+#   python data_source.py snapshot --years 2023 2024
+
+CACHE_DIR = 'cache'
+SNAPSHOT_DIR = os.environ.get('F1_REPLAY_DIR', 'replay_snapshot')
+DATA_SOURCE = os.environ.get('F1_DATA_SOURCE', 'fastf1')
+
+RACE_COLUMNS = ['Year', 'RaceName', 'RoundNumber', 'AirTemp', 'TrackTemp', 'Humidity', 'Rainfall'] + WEATHER_WINDOW_FEATURES
+WEATHER_COLUMNS = ['AirTemp', 'TrackTemp', 'Humidity', 'Rainfall']
+SCHEDULE_COLUMNS = ['RoundNumber', 'EventName', 'EventDate', 'EventFormat']
+
+
+class FastF1Source:
+    """Live FastF1, with its HTTP cache enabled under `cache_dir`."""
+
+    name = 'fastf1'
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        import fastf1
+        self._fastf1 = fastf1
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        fastf1.Cache.enable_cache(cache_dir)
+
+    def get_event_schedule(self, year, include_testing=True):
+        return self._fastf1.get_event_schedule(year, include_testing=include_testing)
+
+    def get_session(self, year, round_number, kind='R'):
+        return self._fastf1.get_session(year, round_number, kind)
+
+
+class ReplaySource:
+    """Offline source: snapshot files first, then rows of the historical dataset.
+
+    `load_latency` makes every session load sleep, to imitate FastF1 cache reads
+    in benchmarks; `loads` counts session loads.
+    """
+
+    name = 'replay'
+
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR, dataset_dir=DATASET_DIR, load_latency=0.0):
+        self.snapshot_dir = snapshot_dir
+        self.dataset_dir = dataset_dir
+        self.load_latency = load_latency
+        self.loads = 0
+        self._races = None
+        self._lock = threading.Lock()
+
+    def _snapshot_path(self, *parts):
+        if not self.snapshot_dir:
+            return None
+        path = os.path.join(self.snapshot_dir, *parts)
+        return path if os.path.exists(path) else None
+
+    def races(self):
+        """{(year, round): dataset rows}, read once."""
+        with self._lock:
+            if self._races is None:
+                try:
+                    df = load_dataset(root=self.dataset_dir)
+                except FileNotFoundError:
+                    df = pd.DataFrame(columns=RACE_COLUMNS)
+                self._races = {(int(y), int(r)): rows.reset_index(drop=True)
+                               for (y, r), rows in df.groupby(['Year', 'RoundNumber'])}
+            return self._races
+
+    def get_event_schedule(self, year, include_testing=True):
+        path = self._snapshot_path('schedule', f"{int(year)}.parquet")
+        if path:
+            schedule = pd.read_parquet(path)
+        else:
+            rounds = sorted((r, rows['RaceName'].iloc[0]) for (y, r), rows in self.races().items() if y == int(year))
+            if not rounds:
+                raise ValueError(f"No replay data for the {year} season")
+            numbers = pd.Series([r for r, _ in rounds])
+            # The dataset has no dates: space races two weeks apart, only their order matters
+            schedule = pd.DataFrame({'RoundNumber': numbers, 'EventName': [name for _, name in rounds],
+                                     'EventDate': pd.Timestamp(f"{int(year)}-03-01") + pd.to_timedelta(numbers * 14, unit='D'),
+                                     'EventFormat': 'conventional'})
+        if not include_testing:
+            schedule = schedule[schedule['EventFormat'] != 'testing']
+        return schedule.reset_index(drop=True)
+
+    def get_session(self, year, round_number, kind='R'):
+        return ReplaySession(self, int(year), int(round_number), kind)
+
+
+class ReplaySession:
+    def __init__(self, source, year, round_number, kind):
+        self._source = source
+        self.year, self.round_number, self.kind = year, round_number, kind
+        self.results = None
+        self.weather_data = None
+        self.weather_window = None
+        self.event = None
+
+    def load(self, **kwargs):
+        source = self._source
+        if source.load_latency:
+            time.sleep(source.load_latency)
+        source.loads += 1
+        base = f"{self.year}/{self.round_number:02d}-{self.kind}"
+        results_path = source._snapshot_path('sessions', f"{base}.results.parquet")
+        if results_path:
+            self.results = pd.read_parquet(results_path)
+            self.weather_data = pd.read_parquet(source._snapshot_path('sessions', f"{base}.weather.parquet"))
+            event_name = pd.read_parquet(source._snapshot_path('schedule', f"{self.year}.parquet")).set_index(
+                'RoundNumber').loc[self.round_number, 'EventName']
+        else:
+            rows = source.races().get((self.year, self.round_number)) if self.kind == 'R' else None
+            if rows is None:
+                raise ValueError(f"No replay data for {self.year} round {self.round_number} ({self.kind})")
+            self.results = rows.drop(columns=[c for c in RACE_COLUMNS if c in rows.columns])
+            # The dataset keeps the start-of-race sample and, for rebuilt rounds, the window reduction
+            self.weather_data = rows[WEATHER_COLUMNS].iloc[:1].reset_index(drop=True)
+            if all(c in rows.columns for c in WEATHER_WINDOW_FEATURES) and pd.notna(rows['TrackTempMean'].iloc[0]):
+                self.weather_window = {c: float(rows[c].iloc[0]) for c in WEATHER_WINDOW_FEATURES}
+            event_name = rows['RaceName'].iloc[0]
+        self.event = pd.Series({'EventName': event_name, 'RoundNumber': self.round_number})
+
+
+def get_source(name=None, **kwargs):
+    """Data source by name (default: F1_DATA_SOURCE)."""
+    name = name or DATA_SOURCE
+    if name == 'fastf1':
+        return FastF1Source(**kwargs)
+    if name == 'replay':
+        return ReplaySource(**kwargs)
+    raise ValueError(f"Unknown data source {name!r} (expected 'fastf1' or 'replay')")
+
+
+def record_snapshot(source, years, snapshot_dir=SNAPSHOT_DIR, kind='R'):
+    """Save schedules and race sessions from `source` for replay. Returns sessions written."""
+    written = 0
+    for year in years:
+        schedule = source.get_event_schedule(year, include_testing=False)
+        schedule = schedule[schedule['EventFormat'] != 'testing'][SCHEDULE_COLUMNS].reset_index(drop=True)
+        os.makedirs(os.path.join(snapshot_dir, 'schedule'), exist_ok=True)
+        os.makedirs(os.path.join(snapshot_dir, 'sessions', str(year)), exist_ok=True)
+        schedule.to_parquet(os.path.join(snapshot_dir, 'schedule', f"{year}.parquet"), index=False)
+        for round_number in schedule['RoundNumber'].astype(int):
+            base = os.path.join(snapshot_dir, 'sessions', str(year), f"{round_number:02d}-{kind}")
+            if os.path.exists(f"{base}.results.parquet"):
+                continue
+            try:
+                session = source.get_session(year, round_number, kind)
+                session.load(weather=True, telemetry=False, messages=False)
+                if session.results is None or session.results.empty:
+                    continue
+                # Weather first: the results file marks the session as complete
+                pd.DataFrame(session.weather_data).to_parquet(f"{base}.weather.parquet", index=False)
+                pd.DataFrame(session.results).to_parquet(f"{base}.results.parquet", index=False)
+                written += 1
+                print(f"Recorded {year} round {round_number}")
+            except Exception as e:
+                print(f"!! Could not record {year} round {round_number}: {e}")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record FastF1 data for the offline replay source.")
+    parser.add_argument('command', choices=['snapshot'])
+    parser.add_argument('--years', type=int, nargs='+', required=True)
+    parser.add_argument('--output', default=SNAPSHOT_DIR)
+    args = parser.parse_args()
+    count = record_snapshot(FastF1Source(), args.years, args.output)
+    print(f"{count} sessions written to {args.output}/")
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Historical race dataset, stored as typed Parquet partitioned by season:
+#   f1_race_data/Year=2018/part.parquet, Year=2019/part.parquet, ...
+# One row per (Year, RoundNumber, Abbreviation). Low-cardinality strings are
+# dictionary-encoded, and readers only pull the columns they ask for.
+# Writers publish what they changed: _changes.jsonl logs the rounds of every
+# published version and _VERSION (replaced atomically) names the latest one.
+# Parquet readers skip both files (leading underscore).
+
+DATASET_DIR = 'f1_race_data'
+LEGACY_CSV = 'f1_race_data_2018_2024.csv'
+KEY_COLUMNS = ['Year', 'RoundNumber', 'Abbreviation']
+PARTITION_FILE = 'part.parquet'
+VERSION_FILE = '_VERSION'
+CHANGES_FILE = '_changes.jsonl'
+
+_DICT = pa.dictionary(pa.int16(), pa.string())
+SCHEMA = pa.schema([
+    ('DriverNumber', pa.string()),
+    ('BroadcastName', pa.string()),
+    ('Abbreviation', _DICT),
+    ('DriverId', pa.string()),
+    ('TeamName', _DICT),
+    ('TeamColor', pa.string()),
+    ('TeamId', pa.string()),
+    ('FirstName', pa.string()),
+    ('LastName', pa.string()),
+    ('FullName', pa.string()),
+    ('HeadshotUrl', pa.string()),
+    ('CountryCode', pa.string()),
+    ('Position', pa.float64()),
+    ('ClassifiedPosition', pa.string()),
+    ('GridPosition', pa.float64()),
+    ('Q1', pa.string()),
+    ('Q2', pa.string()),
+    ('Q3', pa.string()),
+    ('Time', pa.string()),
+    ('Status', _DICT),
+    ('Points', pa.float64()),
+    ('Laps', pa.float64()),
+    ('RaceName', _DICT),
+    ('RoundNumber', pa.int16()),
+    ('AirTemp', pa.float64()),
+    ('TrackTemp', pa.float64()),
+    ('Humidity', pa.float64()),
+    ('Rainfall', pa.bool_()),
+    # Race-window reduction of the weather series (weather_features.py); null for rounds imported from the CSV
+    ('TrackTempMin', pa.float32()),
+    ('TrackTempMax', pa.float32()),
+    ('TrackTempMean', pa.float32()),
+    ('RainMinutes', pa.float32()),
+    ('FirstRainLap', pa.float32()),
+])
+PARTITIONING = ds.partitioning(pa.schema([('Year', pa.int16())]), flavor='hive')
+COLUMNS = ['Year'] + SCHEMA.names
+
+
+def _partition_path(year, root=DATASET_DIR):
+    return os.path.join(root, f"Year={int(year)}", PARTITION_FILE)
+
+
+def _has_partitions(root=DATASET_DIR):
+    return os.path.isdir(root) and any(name.startswith('Year=') for name in os.listdir(root))
+
+
+def dataset_version(root=DATASET_DIR):
+    """Cheap fingerprint of the on-disk dataset (partition paths, sizes, mtimes).
+
+    Changes whenever a partition is rewritten, so derived caches can key on it.
+    """
+    if not os.path.isdir(root):
+        return None
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name, PARTITION_FILE)
+        if name.startswith('Year=') and os.path.exists(path):
+            st = os.stat(path)
+            digest.update(f"{name}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+def published_version(root=DATASET_DIR):
+    """Latest published version number (0 if nothing was published)."""
+    try:
+        with open(os.path.join(root, VERSION_FILE)) as f:
+            return int(json.load(f)['version'])
+    except (FileNotFoundError, ValueError, KeyError):
+        return 0
+
+
+def publish_version(rounds, root=DATASET_DIR):
+    """Record that `rounds` [(year, round), ...] were written; returns the new version number.
+
+    Single writer assumed (the builder / ingestion daemon).
+    """
+    version = published_version(root) + 1
+    record = {"version": version, "published_at": time.time(),
+              "rounds": sorted([int(y), int(r)] for y, r in rounds)}
+    os.makedirs(root, exist_ok=True)
+    # Log first, then move the pointer: a reader never sees a version without its rounds
+    with open(os.path.join(root, CHANGES_FILE), 'a') as f:
+        f.write(json.dumps(record) + "\n")
+    tmp_path = os.path.join(root, f"{VERSION_FILE}.tmp.{os.getpid()}")
+    with open(tmp_path, 'w') as f:
+        json.dump(record, f)
+    os.replace(tmp_path, os.path.join(root, VERSION_FILE))
+    return version
+
+
+def changes_since(version, root=DATASET_DIR):
+    """(latest version, sorted [(year, round), ...] published after `version`)."""
+    latest = published_version(root)
+    rounds = set()
+    if latest > version:
+        with open(os.path.join(root, CHANGES_FILE)) as f:
+            for line in f:
+                record = json.loads(line)
+                if version < record['version'] <= latest:
+                    rounds.update((y, r) for y, r in record['rounds'])
+    return latest, sorted(rounds)
+
+
+def normalize(df):
+    """Coerce a results frame (CSV rows or FastF1 results + race columns) to the schema."""
+    out = pd.DataFrame(index=range(len(df)))
+    out['Year'] = pd.to_numeric(df['Year']).astype('int16').values
+    for field in SCHEMA:
+        values = df[field.name].values if field.name in df.columns else None
+        if values is None:
+            out[field.name] = pd.NA if not pa.types.is_floating(field.type) else float('nan')
+        elif pa.types.is_floating(field.type):
+            out[field.name] = pd.to_numeric(pd.Series(values), errors='coerce').astype('float64').values
+        elif pa.types.is_integer(field.type):
+            out[field.name] = pd.to_numeric(pd.Series(values)).astype('int16').values
+        elif pa.types.is_boolean(field.type):
+            s = pd.Series(values)
+            if s.dtype == object:
+                s = s.astype(str).str.lower().isin(['true', '1', '1.0'])
+            out[field.name] = (pd.to_numeric(s, errors='coerce').fillna(0) > 0).values
+        else:
+            out[field.name] = pd.Series(values).map(lambda x: str(x) if pd.notna(x) and x != '' else None).values
+    return out
+
+
+def _write_partition(year, df, root=DATASET_DIR):
+    path = _partition_path(year, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df = df.sort_values(['RoundNumber', 'Position'], kind='stable', na_position='last')
+    table = pa.Table.from_pandas(df.drop(columns=['Year']), schema=SCHEMA, preserve_index=False)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    pq.write_table(table, tmp_path)
+    # Readers see either the old or the new partition, never a partial one
+    os.replace(tmp_path, path)
+
+
+def upsert_rows(df, root=DATASET_DIR):
+    """Insert or replace rows by (Year, RoundNumber, Abbreviation).
+
+    Only the season partitions touched by `df` are rewritten.
+    """
+    if df is None or df.empty:
+        return 0
+    new_rows = normalize(df).drop_duplicates(subset=KEY_COLUMNS, keep='last')
+    for year, rows in new_rows.groupby('Year'):
+        path = _partition_path(year, root)
+        if os.path.exists(path):
+            existing = load_dataset(years=[year], root=root)
+            keys = pd.MultiIndex.from_frame(rows[KEY_COLUMNS].astype(str))
+            stale = pd.MultiIndex.from_frame(existing[KEY_COLUMNS].astype(str)).isin(keys)
+            rows = pd.concat([normalize(existing[~stale]), rows], ignore_index=True)
+        _write_partition(year, rows, root)
+    return len(new_rows)
+
+
+def migrate_csv(csv_file=LEGACY_CSV, root=DATASET_DIR):
+    """One-off import of the legacy append-only CSV."""
+    df = pd.read_csv(csv_file)
+    count = upsert_rows(df, root)
+    print(f"Imported {count} rows from {csv_file} into {root}/")
+    return count
+
+
+def ensure_dataset(root=DATASET_DIR, csv_file=LEGACY_CSV):
+    """Create the Parquet dataset from the legacy CSV if it doesn't exist yet."""
+    if not _has_partitions(root) and os.path.exists(csv_file):
+        migrate_csv(csv_file, root)
+    return _has_partitions(root)
+
+
+def load_dataset(columns=None, years=None, root=DATASET_DIR):
+    """Read the dataset as a pandas DataFrame.
+
+    `columns` limits the columns read from disk; `years` prunes partitions.
+    Raises FileNotFoundError when there is neither a dataset nor a legacy CSV.
+    """
+    if not ensure_dataset(root):
+        raise FileNotFoundError(f"No dataset at {root}/ and no {LEGACY_CSV} to import")
+    dataset = ds.dataset(root, schema=pa.schema([pa.field('Year', pa.int16())] + list(SCHEMA)),
+                         format='parquet', partitioning=PARTITIONING)
+    filt = ds.field('Year').isin([int(y) for y in years]) if years is not None else None
+    table = dataset.to_table(columns=columns or COLUMNS, filter=filt)
+    df = table.to_pandas()
+    # Dictionary columns come back as Categorical; decode so groupbys don't
+    # emit every category of every season.
+    for name in df.columns:
+        if isinstance(df[name].dtype, pd.CategoricalDtype):
+            df[name] = df[name].astype(object)
+    if 'Year' in df.columns:
+        df['Year'] = df['Year'].astype('int64')
+    if 'RoundNumber' in df.columns:
+        df['RoundNumber'] = df['RoundNumber'].astype('int64')
+    sort_cols = [c for c in ['Year', 'RoundNumber'] if c in df.columns]
+    if sort_cols:
+        df = df.sort_values(sort_cols, kind='stable').reset_index(drop=True)
+    return df
+
+
+if __name__ == "__main__":
+    migrate_csv()
@@ -1,39 +1,21 @@
-import fastf1
 import pandas as pd
-import os
+from data_source import get_source
 
 # Set up pandas to show more columns
 pd.set_option('display.max_columns', None)
 
-# Define the cache directory
-CACHE_DIR = 'cache'
-
-# Check if the cache directory exists, and create it if it doesn't
-if not os.path.exists(CACHE_DIR):
-    try:
-        os.makedirs(CACHE_DIR)
-        print(f"Cache directory '{CACHE_DIR}' created.")
-    except Exception as e:
-        print(f"Error creating cache directory: {e}")
-        pass
-
-# Enable the FastF1 cache
-# This is SUPER important. It will save data locally so you
-# don't have to re-download it every time.
-# Make sure to create a folder named 'cache' in your project directory
-# or change this path to wherever you want to store the cache.
-try:
-    fastf1.Cache.enable_cache(CACHE_DIR)
-    print(f"FastF1 cache enabled at: ./{CACHE_DIR}")
-except Exception as e:
-    print(f"Could not enable cache: {e}. Check folder permissions.")
+# Live FastF1 by default; set F1_DATA_SOURCE=replay to explore offline.
+# The fastf1 source enables the FastF1 cache in ./cache. This is SUPER important.
+# It will save data locally so you don't have to re-download it every time.
+source = get_source()
+print(f"Using the '{source.name}' data source")
 
 # This is our "sandbox" script to see what data looks like for one race.
 print("--- Loading data for a single race (2023 Monza GP) ---")
 
 try:
-    # Get the session data (Year, Race Name, Session Type 'R' for Race)
-    session = fastf1.get_session(2023, 'Monza', 'R')
+    # Get the session data (Year, Round, Session Type 'R' for Race). Monza was round 14.
+    session = source.get_session(2023, 14, 'R')
 
     # Load the data
     # This is the part that downloads the data if it's not in the cache.
@@ -76,7 +58,7 @@ try:
 
 except Exception as e:
     print(f"\nAn error occurred: {e}")
-    print("Please make sure you have a 'cache' folder in your project directory.")
+    print("Please make sure you have a 'cache' folder in your project directory (or data for the replay source).")
 
 print("\n--- Exploration complete ---")
 print("Next steps:")
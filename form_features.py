@@ -0,0 +1,207 @@
+import hashlib
+import threading
+from bisect import bisect_left, bisect_right
+import numpy as np
+import pandas as pd
+
+# Recent-form features shared by train_model.py and api.py.
+# driver_form / constructor_form are the mean points of the last FORM_WINDOW
+# results of a driver / team *before* the race being predicted. State lives in
+# fixed-size ring buffers, so adding one race costs O(drivers in race).
+# Training walks the whole dataset (add_form_features); serving reads the same
+# state from a FormIndex fed with every stored round.
+
+FORM_WINDOW = 5
+FORM_FEATURES = ['driver_form', 'constructor_form']
+
+
+class RingBufferForm:
+    """Rolling mean of the last `window` values per key."""
+
+    def __init__(self, window=FORM_WINDOW):
+        self.window = window
+        self._ids = {}
+        self._buf = np.zeros((0, window))
+        self._pos = np.zeros(0, dtype=np.int64)
+        self._count = np.zeros(0, dtype=np.int64)
+
+    def _index(self, keys, grow=True):
+        idx = np.empty(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys):
+            slot = self._ids.get(key)
+            if slot is None:
+                if not grow:
+                    idx[i] = -1
+                    continue
+                slot = self._ids[key] = len(self._ids)
+            idx[i] = slot
+        n = len(self._ids)
+        if n > len(self._count):
+            extra = n - len(self._count)
+            self._buf = np.vstack([self._buf, np.zeros((extra, self.window))])
+            self._pos = np.concatenate([self._pos, np.zeros(extra, dtype=np.int64)])
+            self._count = np.concatenate([self._count, np.zeros(extra, dtype=np.int64)])
+        return idx
+
+    def means(self, keys):
+        """Current rolling mean per key (0 for keys never seen)."""
+        idx = self._index(list(keys), grow=False)
+        out = np.zeros(len(idx))
+        known = idx >= 0
+        if known.any():
+            slots = idx[known]
+            counts = self._count[slots]
+            sums = self._buf[slots].sum(axis=1)
+            out[known] = np.divide(sums, counts, out=np.zeros(len(slots)), where=counts > 0)
+        return out
+
+    def push(self, keys, values):
+        """Append one value per key. Repeated keys are applied in order."""
+        keys = list(keys)
+        values = np.asarray(values, dtype=float)
+        idx = self._index(keys)
+        # A key can appear more than once per race (two drivers per team), so
+        # apply the updates in passes where every slot is touched at most once.
+        occurrence = pd.Series(idx).groupby(idx).cumcount().to_numpy()
+        for k in range(occurrence.max() + 1 if len(idx) else 0):
+            sel = occurrence == k
+            slots = idx[sel]
+            self._buf[slots, self._pos[slots]] = values[sel]
+            self._pos[slots] = (self._pos[slots] + 1) % self.window
+            self._count[slots] = np.minimum(self._count[slots] + 1, self.window)
+
+    def copy(self):
+        other = RingBufferForm(self.window)
+        other._ids = dict(self._ids)
+        other._buf, other._pos, other._count = self._buf.copy(), self._pos.copy(), self._count.copy()
+        return other
+
+
+class FormTracker:
+    """Driver and constructor form, advanced one race at a time."""
+
+    def __init__(self, window=FORM_WINDOW):
+        self.drivers = RingBufferForm(window)
+        self.teams = RingBufferForm(window)
+
+    def update(self, race_results):
+        """Record the points scored in one race."""
+        points = pd.to_numeric(race_results['Points'], errors='coerce')
+        scored = points.notna().to_numpy()
+        self.drivers.push(race_results['Abbreviation'].to_numpy()[scored], points.to_numpy()[scored])
+        self.teams.push(race_results['TeamName'].to_numpy()[scored], points.to_numpy()[scored])
+
+    def features(self, race_entries):
+        """driver_form / constructor_form for the entries of an upcoming race."""
+        return pd.DataFrame({
+            'driver_form': self.drivers.means(race_entries['Abbreviation'].to_numpy()),
+            'constructor_form': self.teams.means(race_entries['TeamName'].to_numpy()),
+        }, index=race_entries.index)
+
+    def copy(self):
+        other = FormTracker(self.drivers.window)
+        other.drivers, other.teams = self.drivers.copy(), self.teams.copy()
+        return other
+
+    def feed(self, history):
+        """Advance through every race in `history`, oldest first."""
+        if history is None or history.empty:
+            return self
+        history = history.sort_values(['Year', 'RoundNumber'], kind='stable')
+        for _, positions in _race_groups(history):
+            self.update(history.iloc[positions])
+        return self
+
+
+def _race_groups(df):
+    groups = df.groupby(['Year', 'RoundNumber'], sort=True).indices
+    return sorted(groups.items())
+
+
+def add_form_features(df, window=FORM_WINDOW):
+    """Return a copy of `df` with pre-race form columns (training path)."""
+    df = df.sort_values(['Year', 'RoundNumber'], kind='stable').copy()
+    tracker = FormTracker(window)
+    form = np.zeros((len(df), 2))
+    for _, positions in _race_groups(df):
+        rows = df.iloc[positions]
+        form[positions] = tracker.features(rows).to_numpy()
+        tracker.update(rows)
+    df['driver_form'] = form[:, 0]
+    df['constructor_form'] = form[:, 1]
+    return df
+
+
+class FormIndex:
+    """Pre-race form for any round, from one tracker fed with the full history (serving path).
+
+    The tracker state is snapshotted after every indexed round, so the form
+    before (year, round) is read from the snapshot of the last earlier round.
+    Rounds arriving in order cost one tracker update; a round inserted before
+    others, or replaced with different results, replays the rounds after it.
+
+    Alongside, a digest chained over every indexed round identifies the history
+    up to a round, so results derived from it can be cached per history.
+    """
+
+    COLUMNS = ['Abbreviation', 'TeamName', 'Points']
+    DIGEST_COLUMNS = ['Abbreviation', 'FullName', 'TeamName', 'GridPosition', 'Position', 'Points']
+
+    def __init__(self, window=FORM_WINDOW):
+        self.window = window
+        self._keys = []       # (year, round), sorted
+        self._rows = {}       # (year, round) -> results used for form
+        self._digests = {}    # (year, round) -> digest of that round's results
+        self._snapshots = []  # tracker after each key; never mutated once stored
+        self._chain = []      # history digest up to and including each key
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _digest(cls, rows):
+        text = rows[[c for c in cls.DIGEST_COLUMNS if c in rows.columns]].to_csv(index=False)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add_round(self, year, round_number, rows):
+        """Index one round's results. Returns False if they are already indexed unchanged."""
+        key = (int(year), int(round_number))
+        digest = self._digest(rows)
+        rows = rows[self.COLUMNS].reset_index(drop=True)
+        with self._lock:
+            known = key in self._rows
+            if known and self._digests[key] == digest:
+                return False
+            self._rows[key], self._digests[key] = rows, digest
+            i = bisect_left(self._keys, key)
+            if not known:
+                self._keys.insert(i, key)
+            tracker = self._snapshots[i - 1].copy() if i else FormTracker(self.window)
+            chained = self._chain[i - 1] if i else ''
+            del self._snapshots[i:], self._chain[i:]
+            for k in self._keys[i:]:
+                tracker.update(self._rows[k])
+                self._snapshots.append(tracker.copy())
+                chained = hashlib.sha1(f"{chained}{k}{self._digests[k]}".encode()).hexdigest()
+                self._chain.append(chained)
+        return True
+
+    def build(self, df):
+        """Index every round of `df` (dataset or season-store rows)."""
+        df = df.sort_values(['Year', 'RoundNumber'], kind='stable')
+        return sum(self.add_round(year, round_number, rows)
+                   for (year, round_number), rows in df.groupby(['Year', 'RoundNumber'], sort=True))
+
+    def features(self, year, round_number, race_entries):
+        """driver_form / constructor_form before (year, round_number) for `race_entries`."""
+        with self._lock:
+            i = bisect_left(self._keys, (int(year), int(round_number)))
+            tracker = self._snapshots[i - 1] if i else FormTracker(self.window)
+        return tracker.features(race_entries)
+
+    def history_digest(self, year, round_number):
+        """Digest of every indexed round up to and including (year, round_number)."""
+        with self._lock:
+            i = bisect_right(self._keys, (int(year), int(round_number)))
+            return self._chain[i - 1] if i else hashlib.sha1(b'').hexdigest()
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+import pandas as pd
+from dataset import DATASET_DIR, dataset_version, load_dataset
+
+# Season insights for /insights/{year} and the multi-season /insights?years=.
+# The numbers only depend on the dataset, so every season is computed once per
+# dataset version (all seasons in one grouped pass) and served as
+# pre-serialized JSON with an ETag.
+
+INSIGHTS_COLUMNS = ['Year', 'RaceName', 'Abbreviation', 'TeamName', 'GridPosition', 'Position', 'Points', 'TrackTemp', 'Rainfall']
+VERSION_CHECK_INTERVAL = 5.0  # seconds between dataset version checks
+MAX_RANGES = 64  # multi-season responses kept (LRU)
+
+
+def _ranked(values):
+    """{year: values of that year sorted descending}, for a (Year, key...)-indexed series.
+
+    Uses the same sort as the per-season code it replaced, so tie-breaks don't change.
+    """
+    return {int(year): group.droplevel(0).sort_values(ascending=False) for year, group in values.groupby(level=0)}
+
+
+def season_table(df):
+    """Headline stats of every season in `df`, one row per Year, from one set of grouped reductions."""
+    finished = df['Position'].notna()
+    won = df['Position'] == 1
+    points = _ranked(df.groupby(['Year', 'Abbreviation', 'TeamName'])['Points'].sum())
+    team_points = _ranked(df.groupby(['Year', 'TeamName'])['Points'].sum())
+    wins = df[won].groupby(['Year', 'Abbreviation']).size()
+    winners = df[won]
+    pole_rate = ((winners['GridPosition'] == 1).groupby(winners['Year']).mean() * 100).round(1)
+    dnf_rate = ((1 - finished.groupby(df['Year']).mean()) * 100).round(1)
+    finishers = df[finished]
+    gained = _ranked((finishers['GridPosition'] - finishers['Position']).groupby([finishers['Year'], finishers['Abbreviation']]).sum())
+    top10 = _ranked(df[df['Position'] <= 10].groupby(['Year', 'Abbreviation']).size())
+    avg_temp = df.groupby('Year')['TrackTemp'].mean().round(1)
+    rainy = df[df['Rainfall'] > 0].groupby('Year')['RaceName'].nunique()
+
+    rows = []
+    for year in sorted(points):
+        (champ, champ_team), c_pts = points[year].index[0], team_points[year]
+        rows.append({
+            "Year": year, "champion": champ, "champion_team": champ_team, "champion_points": points[year].iloc[0],
+            "champion_wins": int(wins.get((year, champ), 0)),
+            "constructor": c_pts.index[0], "constructor_points": c_pts.iloc[0],
+            "constructor_margin": c_pts.iloc[0] - (c_pts.iloc[1] if len(c_pts) > 1 else 0),
+            "pole_rate": pole_rate.get(year, 0), "dnf_rate": dnf_rate[year],
+            "overtake_driver": gained[year].index[0], "overtake_gained": gained[year].iloc[0],
+            "consistency_driver": top10[year].index[0], "consistency_top10": top10[year].iloc[0],
+            "avg_track_temp": avg_temp[year], "rainy_races": int(rainy.get(year, 0)),
+        })
+    return pd.DataFrame(rows).set_index('Year')
+
+
+def year_insights(row, year):
+    """/insights/{year} payload from one row of `season_table`."""
+    champ, champ_team, pole_win_pct = row['champion'], row['champion_team'], row['pole_rate']
+    dnf_rate, overtake_king, total_gained = row['dnf_rate'], row['overtake_driver'], int(row['overtake_gained'])
+    consistent_driver, consistent_count = row['consistency_driver'], int(row['consistency_top10'])
+    avg_temp, rainy_races = row['avg_track_temp'], int(row['rainy_races'])
+    return {
+        "year": year,
+        "champion": {"name": champ, "team": champ_team, "points": int(row['champion_points']), "detail": f"{champ} secured the title with {int(row['champion_wins'])} victories. Logic: Calculation is based on total points accumulated across all sessions in {year}."},
+        "constructor": {"name": row['constructor'], "points": int(row['constructor_points']), "detail": f"{row['constructor']} demonstrated engineering superiority, outperforming the closest rival by {int(row['constructor_margin'])} points."},
+        "pole_rate": {"value": pole_win_pct, "detail": f"Pole conversion reflects the percentage of race winners who also secured P1 in Qualifying. In {year}, starting on Pole was {'a critical advantage' if pole_win_pct > 50 else 'less predictive of success'} at {pole_win_pct}%."},
+        "reliability": {"value": dnf_rate, "detail": f"We define Reliability based on Race Classification. Note: Under FIA rules, a driver can be classified (completed 90% distance) even if they retired from the race. Our model tracks unclassified DNFs (NaN positions), which may result in a lower statistical rate than total retirements observed on track."},
+        "overtake": {"driver": overtake_king, "value": total_gained, "detail": f"Overtake King is calculated by subtracting finishing position from grid position for all classified finishes. {overtake_king} gained a net total of {total_gained} positions across the season."},
+        "consistency": {"driver": consistent_driver, "value": consistent_count, "detail": f"Consistency reflects the reliability of performance. {consistent_driver} finished inside the points-paying positions (Top 10) in {consistent_count} separate race sessions."},
+        "weather": {"avg_temp": avg_temp, "rainy": rainy_races, "detail": f"Environmental data is averaged across all sessions. In {year}, {rainy_races} events featured recorded rainfall at the start of the race session."},
+    }
+
+
+def columnar(table):
+    """Multi-season payload: one list per stat, aligned with "years"."""
+    payload = {"years": [int(y) for y in table.index]}
+    for name in table.columns:
+        values = table[name].tolist()
+        payload[name] = [v.item() if hasattr(v, 'item') else v for v in values]
+    return payload
+
+
+class CachedInsights:
+    __slots__ = ('body', 'etag')
+
+    def __init__(self, payload):
+        self.body = json.dumps(payload).encode('utf-8')
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest() + '"'
+
+
+class InsightsCache:
+    """Per-season insights, rebuilt whenever the dataset version changes."""
+
+    def __init__(self, root=DATASET_DIR, check_interval=VERSION_CHECK_INTERVAL):
+        self.root = root
+        self.check_interval = check_interval
+        self.version = None
+        self.table = None
+        self._seasons = {}
+        self._ranges = OrderedDict()
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, df=None):
+        """Recompute every season. Pass `df` to reuse an already loaded frame."""
+        version = dataset_version(self.root)
+        if df is None:
+            df = load_dataset(INSIGHTS_COLUMNS, root=self.root)
+        table = season_table(df)
+        seasons = {int(year): CachedInsights(year_insights(row, int(year))) for year, row in table.iterrows()}
+        with self._lock:
+            self.table, self._seasons, self._ranges, self.version = table, seasons, OrderedDict(), version
+            self._checked_at = time.monotonic()
+        return len(seasons)
+
+    def refresh_years(self, df):
+        """Recompute only the seasons in `df` (all rows of each), e.g. after new rounds were ingested."""
+        version = dataset_version(self.root)
+        updated = season_table(df)
+        seasons = {int(year): CachedInsights(year_insights(row, int(year))) for year, row in updated.iterrows()}
+        with self._lock:
+            table = updated if self.table is None else pd.concat([self.table.drop(updated.index, errors='ignore'), updated])
+            self.table = table.sort_index()
+            self._seasons = {**self._seasons, **seasons}
+            self._ranges, self.version = OrderedDict(), version
+            self._checked_at = time.monotonic()
+        return len(seasons)
+
+    def stale(self, force=False):
+        """True if the dataset changed since the last refresh (checked at most every `check_interval` unless `force`)."""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        return dataset_version(self.root) != self.version
+
+    def get(self, year):
+        """CachedInsights for `year`, or None if the season isn't in the dataset."""
+        return self._seasons.get(int(year))
+
+    def compare(self, years):
+        """CachedInsights with the columnar stats of `years` (seasons missing from the dataset are skipped)."""
+        table = self.table
+        key = tuple(sorted(set(int(y) for y in years).intersection(table.index.tolist())))
+        with self._lock:
+            cached = self._ranges.get(key)
+            if cached is not None:
+                self._ranges.move_to_end(key)
+                return cached
+        cached = CachedInsights(columnar(table.loc[table.index.isin(key)]))
+        with self._lock:
+            if table is self.table:
+                self._ranges[key] = cached
+                while len(self._ranges) > MAX_RANGES:
+                    self._ranges.popitem(last=False)
+        return cached
+
+    def __len__(self):
+        return len(self._seasons)
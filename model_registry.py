@@ -0,0 +1,155 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+import joblib
+import numpy as np
+from compact_forest import COMPACT_MODEL_DIR, CompactForest, export_forest
+from race_features import FEATURES
+
+# Local registry of versioned models:
+#   models/<version>/model.joblib   sklearn estimator
+#   models/<version>/forest/        compact export used for serving
+#   models/<version>/meta.json      features, target, metrics, params
+#   models/CURRENT                  active version (replaced atomically)
+# Without any registered version, the legacy root artifacts are served as 'legacy'.
+
+REGISTRY_DIR = 'models'
+LEGACY_VERSION = 'legacy'
+LEGACY_JOBLIB = 'f1_prediction_model.joblib'
+LOADED_MODELS = 4  # versions kept in memory for pinned requests
+
+
+class LoadedModel:
+    """A model version ready to score: selects its own features from X."""
+
+    def __init__(self, version, predictor, meta):
+        self.version = version
+        self.predictor = predictor
+        self.meta = meta
+        self.features = meta.get('features') or FEATURES
+
+    def predict(self, X):
+        if hasattr(X, 'columns'):
+            X = X[self.features]
+        return self.predictor.predict(X)
+
+    def predict_per_tree(self, X):
+        """Prediction of every tree, shape (n_samples, n_trees)."""
+        if hasattr(X, 'columns'):
+            X = X[self.features]
+        if hasattr(self.predictor, 'predict_per_tree'):
+            return self.predictor.predict_per_tree(X)
+        X = np.asarray(X, dtype=np.float32)
+        return np.column_stack([tree.predict(X) for tree in self.predictor.estimators_])
+
+
+class ModelRegistry:
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def _version_dir(self, version):
+        """Directory of a registered version. Versions come from requests, so anything that isn't
+        a plain directory name under the registry (separators, '..', hidden/temp dirs) is unknown."""
+        if (not isinstance(version, str) or not version or version.startswith('.')
+                or os.path.basename(version) != version or (os.altsep and os.altsep in version)):
+            raise KeyError(f"Unknown model version {version!r}")
+        path = self._path(version)
+        if not os.path.exists(os.path.join(path, 'meta.json')):
+            raise KeyError(f"Unknown model version {version!r}")
+        return path
+
+    def versions(self):
+        """Metadata of every registered version, newest first."""
+        if not os.path.isdir(self.root):
+            return []
+        metas = []
+        for name in os.listdir(self.root):
+            meta_file = self._path(name, 'meta.json')
+            if os.path.exists(meta_file):
+                with open(meta_file) as f:
+                    metas.append(json.load(f))
+        return sorted(metas, key=lambda m: m['created_at'], reverse=True)
+
+    def current_version(self):
+        try:
+            with open(self._path('CURRENT')) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            versions = self.versions()
+            return versions[0]['version'] if versions else LEGACY_VERSION
+
+    def set_current(self, version):
+        if version != LEGACY_VERSION:
+            self._version_dir(version)
+        os.makedirs(self.root, exist_ok=True)
+        tmp_file = self._path(f"CURRENT.tmp.{os.getpid()}")
+        with open(tmp_file, 'w') as f:
+            f.write(version)
+        os.replace(tmp_file, self._path('CURRENT'))
+
+    def register(self, model, features, metrics, params=None, target='Position', promote=True, extra=None):
+        """Store a trained model as a new version; returns the version id."""
+        version = time.strftime('v%Y%m%d-%H%M%S') + '-' + uuid.uuid4().hex[:6]
+        # Build in a temp dir and rename, so a half-written version is never listed
+        tmp_dir = self._path(f".{version}.tmp")
+        os.makedirs(tmp_dir)
+        joblib.dump(model, os.path.join(tmp_dir, 'model.joblib'))
+        export_forest(model, os.path.join(tmp_dir, 'forest'), list(features))
+        meta = {"version": version, "created_at": time.time(), "features": list(features), "target": target,
+                "metrics": metrics, "params": params or {}}
+        meta.update(extra or {})
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=1)
+        os.rename(tmp_dir, self._path(version))
+        if promote:
+            self.set_current(version)
+        return version
+
+    def _load(self, version):
+        if version == LEGACY_VERSION:
+            # The legacy artifacts are overwritten in place by retraining, so identify them by file stamp
+            compact_meta = os.path.join(COMPACT_MODEL_DIR, 'meta.json')
+            path = compact_meta if os.path.exists(compact_meta) else LEGACY_JOBLIB
+            stat = os.stat(path)
+            meta = {"version": LEGACY_VERSION, "features": FEATURES, "metrics": {},
+                    "fingerprint": f"{LEGACY_VERSION}-{stat.st_mtime_ns:x}-{stat.st_size:x}"}
+            if path == compact_meta:
+                return LoadedModel(version, CompactForest.load(COMPACT_MODEL_DIR), meta)
+            return LoadedModel(version, joblib.load(LEGACY_JOBLIB), meta)
+        version_dir = self._version_dir(version)
+        with open(os.path.join(version_dir, 'meta.json')) as f:
+            meta = json.load(f)
+        meta.setdefault('fingerprint', version)
+        forest_dir = os.path.join(version_dir, 'forest')
+        if os.path.exists(os.path.join(forest_dir, 'meta.json')):
+            return LoadedModel(version, CompactForest.load(forest_dir), meta)
+        return LoadedModel(version, joblib.load(os.path.join(version_dir, 'model.joblib')), meta)
+
+    def get(self, version=None):
+        """LoadedModel for `version` (default: current). Recently used versions stay in memory."""
+        version = version or self.current_version()
+        with self._lock:
+            if version in self._loaded:
+                self._loaded.move_to_end(version)
+                return self._loaded[version]
+        loaded = self._load(version)
+        with self._lock:
+            self._loaded[version] = loaded
+            while len(self._loaded) > LOADED_MODELS:
+                self._loaded.popitem(last=False)
+        return loaded
+
+    def reload_current(self):
+        """Load the current version from disk, bypassing the in-memory copy."""
+        version = self.current_version()
+        with self._lock:
+            self._loaded.pop(version, None)
+        return self.get(version)
@@ -0,0 +1,101 @@
+import pandas as pd
+import metrics
+from weather_features import WEATHER_WINDOW_FEATURES
+
+# Builds model inputs for a race from the season store and the session cache.
+# Used by /predict (one race) and /predict/batch (many races in one pass).
+
+FEATURES = ['GridPosition', 'driver_form', 'constructor_form', 'AirTemp', 'TrackTemp', 'Humidity', 'Rainfall']
+OUTPUT_COLUMNS = ['PredictedRank', 'Abbreviation', 'FullName', 'TeamName', 'GridPosition', 'ActualPosition']
+
+
+def missing_prior_rounds(store, year, round_number, schedule):
+    """Scheduled rounds before `round_number` that the store doesn't hold."""
+    stored_rounds = store.rounds(year)
+    prior_rounds = schedule[schedule['RoundNumber'] < round_number]['RoundNumber']
+    return [int(r) for r in prior_rounds if int(r) not in stored_rounds]
+
+
+def ensure_prior_rounds(store, sessions, year, round_number, schedule):
+    """Load into the store every round before `round_number` it doesn't hold yet."""
+    prior_rounds = schedule[schedule['RoundNumber'] < round_number]['RoundNumber']
+    # Only rounds missing from the season store need a FastF1 load
+    stored_rounds = store.rounds(year)
+    for r in prior_rounds:
+        if int(r) in stored_rounds:
+            metrics.CACHE_EVENTS.inc(cache='season_store', result='hit')
+            continue
+        metrics.CACHE_EVENTS.inc(cache='season_store', result='miss')
+        try:
+            store.add_round(year, r, sessions.session(year, r).results)
+        except Exception:
+            pass
+
+
+def load_race(store, sessions, year, round_number):
+    """Results, start-of-race weather and weather-window features of one race.
+
+    Finished races are added to the store.
+    """
+    session = sessions.session(year, round_number)
+    race_data = session.results.copy()
+    weather = pd.concat([session.weather_data.iloc[0], pd.Series(session.weather_window, dtype='float64')])
+    if pd.to_numeric(race_data['Position'], errors='coerce').notna().any():
+        store.add_round(year, round_number, race_data)
+    return race_data, weather
+
+
+def feature_frame(race_data, form_data, weather):
+    """Model input rows (FEATURES, then WEATHER_WINDOW_FEATURES) for the entries of one race."""
+    df_p = pd.DataFrame(index=race_data.index)
+    df_p['GridPosition'] = pd.to_numeric(race_data['GridPosition'], errors='coerce').replace(0, 20).fillna(20)
+    df_p = pd.concat([df_p, form_data], axis=1)
+    df_p['AirTemp'], df_p['TrackTemp'], df_p['Humidity'] = weather['AirTemp'], weather['TrackTemp'], weather['Humidity']
+    df_p['Rainfall'] = 1 if weather['Rainfall'] else 0
+    # Built for every race so models trained with them can be served (LoadedModel picks its own columns)
+    for name in WEATHER_WINDOW_FEATURES:
+        df_p[name] = weather.get(name, float('nan'))
+    return df_p[FEATURES + WEATHER_WINDOW_FEATURES]
+
+
+def race_features(store, sessions, year, round_number, schedule, form):
+    """(race_data, X) for one race. `form` is the FormIndex fed by `store`."""
+    with metrics.stage('prior_rounds'):
+        ensure_prior_rounds(store, sessions, year, round_number, schedule)
+    with metrics.stage('race_session'):
+        race_data, weather = load_race(store, sessions, year, round_number)
+    with metrics.stage('features'):
+        # Same rolling form as training: last 5 results over the whole history
+        return race_data, feature_frame(race_data, form.features(year, round_number, race_data), weather)
+
+
+def season_features(store, sessions, year, rounds, form):
+    """Features for several rounds of one season.
+
+    Yields (round, event_name, race_data, X, error) in round order.
+    """
+    schedule = sessions.schedule(year)
+    names = dict(zip(schedule['RoundNumber'].astype(int), schedule['EventName']))
+    rounds = sorted(set(int(r) for r in rounds))
+    with metrics.stage('prior_rounds'):
+        ensure_prior_rounds(store, sessions, year, max(rounds), schedule)
+    for r in rounds:
+        try:
+            if r not in names:
+                raise ValueError(f"No round {r} in the {year} schedule")
+            race_data, weather = load_race(store, sessions, year, r)
+            yield r, names[r], race_data, feature_frame(race_data, form.features(year, r, race_data), weather), None
+        except Exception as e:
+            yield r, names.get(r), None, None, str(e)
+
+
+def format_predictions(race_data, predicted):
+    """Prediction records sorted by predicted finishing order."""
+    race_data = race_data.copy()
+    race_data['PredictedPosition'] = predicted
+    race_data['ActualPosition'] = pd.to_numeric(race_data['Position'], errors='coerce')
+    race_data['PredictedRank'] = race_data['PredictedPosition'].rank(method='first').astype(int)
+    output = race_data.sort_values(by='PredictedRank')[OUTPUT_COLUMNS]
+    # object first: on float columns where() would turn None back into NaN, which isn't valid JSON
+    output = output.astype(object).where(pd.notnull(output), None)
+    return output.to_dict(orient='records')
@@ -0,0 +1,154 @@
+import gzip
+import hashlib
+import os
+import threading
+
+# Persistent cache of /predict responses for finished races, shared by every
+# API worker on the host through the filesystem:
+#   response_cache/objects/ab/<sha256>.json.gz   compressed body, named by content
+#   response_cache/keys/<model key>/<year>-<round>-<history>   sha256 of the body for that request
+# <history> identifies the stored results the body was built from, so a
+# corrected round misses every cached race after it.
+# Writes go through temp files + rename, so workers never read partial entries.
+# Key files' mtimes record last use; the least recently used are evicted once
+# the objects exceed the size budget. A budget of 0 disables the cache.
+
+RESPONSE_CACHE_DIR = 'response_cache'
+RESPONSE_CACHE_BYTES = int(os.environ.get('F1_RESPONSE_CACHE_MB', '64')) * 1024 * 1024
+
+
+def _atomic_write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class ResponseCache:
+    def __init__(self, root=RESPONSE_CACHE_DIR, max_bytes=RESPONSE_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._bytes = None  # objects size, scanned lazily
+
+    def _key_path(self, model_key, year, round_number, history):
+        return os.path.join(self.root, 'keys', model_key, f"{int(year)}-{int(round_number)}-{history[:16]}")
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], f"{digest}.json.gz")
+
+    def get(self, model_key, year, round_number, history):
+        """Cached JSON body (bytes) for the request, or None."""
+        if self.max_bytes <= 0:
+            return None
+        key_path = self._key_path(model_key, year, round_number, history)
+        try:
+            with open(key_path) as f:
+                digest = f.read().strip()
+            with open(self._object_path(digest), 'rb') as f:
+                body = gzip.decompress(f.read())
+        except (FileNotFoundError, OSError, EOFError):
+            return None
+        try:
+            os.utime(key_path)
+        except FileNotFoundError:
+            pass
+        return body
+
+    def put(self, model_key, year, round_number, history, body):
+        """Store a JSON body (bytes). Identical bodies share one object."""
+        digest = hashlib.sha256(body).hexdigest()
+        if self.max_bytes <= 0:
+            return digest
+        object_path = self._object_path(digest)
+        added = 0
+        if not os.path.exists(object_path):
+            data = gzip.compress(body, compresslevel=6, mtime=0)
+            _atomic_write(object_path, data)
+            added = len(data)
+        _atomic_write(self._key_path(model_key, year, round_number, history), digest.encode())
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self._scan_bytes()
+            else:
+                self._bytes += added
+            over = self._bytes > self.max_bytes
+        if over:
+            self.evict()
+        return digest
+
+    def _scan_bytes(self):
+        total = 0
+        for dirpath, _, files in os.walk(os.path.join(self.root, 'objects')):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, name))
+                except FileNotFoundError:
+                    pass
+        return total
+
+    def evict(self, target=None):
+        """Drop least recently used keys, then unreferenced objects, until under `target` bytes."""
+        target = self.max_bytes * 0.8 if target is None else target
+        keys = []
+        for dirpath, _, files in os.walk(os.path.join(self.root, 'keys')):
+            for name in files:
+                if '.tmp.' in name:  # another worker's write in progress
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    keys.append((os.path.getmtime(path), path))
+                except FileNotFoundError:
+                    pass
+        keys.sort()
+        live = {}
+        for _, path in keys:
+            try:
+                with open(path) as f:
+                    live.setdefault(f.read().strip(), []).append(path)
+            except FileNotFoundError:
+                pass
+        sizes = {}
+        for dirpath, _, files in os.walk(os.path.join(self.root, 'objects')):
+            for name in files:
+                if name.endswith('.json.gz'):
+                    try:
+                        sizes[name[:-len('.json.gz')]] = os.path.getsize(os.path.join(dirpath, name))
+                    except FileNotFoundError:
+                        pass
+        total = sum(sizes.values())
+        removed = set()
+        for digest in [d for d in sizes if d not in live]:
+            total -= sizes[digest]
+            removed.add(digest)
+        # Other workers evict from the same directory: any file may vanish under us
+        for _, path in keys:
+            if total <= target:
+                break
+            try:
+                with open(path) as f:
+                    digest = f.read().strip()
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            paths = live.get(digest, [])
+            if path in paths:
+                paths.remove(path)
+            if not paths and digest in sizes and digest not in removed:
+                total -= sizes[digest]
+                removed.add(digest)
+        for digest in removed:
+            try:
+                os.remove(self._object_path(digest))
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._bytes = total
+        return len(removed)
+
+    def stats(self):
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self._scan_bytes()
+            return {"bytes": self._bytes, "max_bytes": self.max_bytes}
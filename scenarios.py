@@ -0,0 +1,99 @@
+import itertools
+import math
+import numpy as np
+import pandas as pd
+
+# What-if sweeps for POST /predict/scenarios. Every scenario of a race is a copy
+# of its feature matrix with weather and/or grid values overridden; all of them
+# are stacked into one (scenarios, drivers, features) array and scored with a
+# single model call.
+
+WEATHER_FEATURES = ['AirTemp', 'TrackTemp', 'Humidity', 'Rainfall']
+MAX_SCENARIOS = 5000
+PIT_LANE_GRID = 20  # grid 0 (pit-lane start) is modelled as last, as in race_features.feature_frame
+
+
+def _check_weather(sweep):
+    unknown = set(sweep or {}) - set(WEATHER_FEATURES)
+    if unknown:
+        raise ValueError(f"Unknown weather features {sorted(unknown)}; expected some of {WEATHER_FEATURES}")
+
+
+def scenario_count(sweep, grids):
+    """Number of scenarios a request expands to, without expanding it."""
+    return math.prod(len(values) for values in (sweep or {}).values()) * len(grids or [None])
+
+
+def weather_combinations(sweep):
+    """Cartesian product of {feature: [values]} as a list of {feature: value} dicts."""
+    if not sweep:
+        return [{}]
+    _check_weather(sweep)
+    keys = [k for k in WEATHER_FEATURES if k in sweep]
+    return [dict(zip(keys, values)) for values in itertools.product(*(sweep[k] for k in keys))]
+
+
+def scenario_tensor(X, features, abbreviations, weathers, grids):
+    """Stack every (weather, grid) combination of the race rows `X`.
+
+    `grids` are {abbreviation: grid position} overrides (None = actual grid).
+    Returns the (S, N, F) feature array and the per-scenario descriptions.
+    """
+    base = X[features].to_numpy(dtype=np.float64)
+    n_weather, n_grid = len(weathers), len(grids)
+    tensor = np.repeat(base[None, :, :], n_weather * n_grid, axis=0)
+    # Scenario s = w * n_grid + g, viewed as (W, G, N, F) to assign whole blocks at once
+    blocks = tensor.reshape(n_weather, n_grid, *base.shape)
+
+    for name in WEATHER_FEATURES:
+        if name not in features:
+            continue
+        values = np.array([w.get(name, np.nan) for w in weathers], dtype=np.float64)
+        rows = ~np.isnan(values)
+        if name == 'Rainfall':
+            values = (values > 0).astype(np.float64)
+        blocks[rows, :, :, features.index(name)] = values[rows, None, None]
+
+    if 'GridPosition' in features:
+        position = {abbr: i for i, abbr in enumerate(abbreviations)}
+        grid_values = np.repeat(base[None, :, features.index('GridPosition')], n_grid, axis=0)
+        for g, overrides in enumerate(grids):
+            for abbr, value in (overrides or {}).items():
+                if abbr not in position:
+                    raise ValueError(f"Driver {abbr!r} is not entered in this race")
+                if value < 0:
+                    raise ValueError(f"Grid position {value} for {abbr!r} is invalid (0 = pit lane)")
+                grid_values[g, position[abbr]] = value if value > 0 else PIT_LANE_GRID
+        blocks[:, :, :, features.index('GridPosition')] = grid_values[None, :, :]
+
+    described = [{"weather": w, "grid": g} for w in weathers for g in grids]
+    return tensor, described
+
+
+def ranks(predicted):
+    """1-based predicted finishing order per scenario; ties keep entry order, as in /predict."""
+    order = np.argsort(predicted, axis=1, kind='stable')
+    out = np.empty_like(order)
+    np.put_along_axis(out, order, np.arange(1, predicted.shape[1] + 1)[None, :], axis=1)
+    return out
+
+
+def score_scenarios(model, race_data, X, weather=None, grids=None):
+    """Predictions for every scenario of one race, as columnar lists aligned with `drivers`."""
+    # Checked before building the product: a short request body can describe millions of scenarios
+    _check_weather(weather)
+    grids = grids or [None]
+    count = scenario_count(weather, grids)
+    if count > MAX_SCENARIOS:
+        raise ValueError(f"{count} scenarios requested; the limit is {MAX_SCENARIOS}")
+    weathers = weather_combinations(weather)
+    abbreviations = race_data['Abbreviation'].tolist()
+    tensor, described = scenario_tensor(X, model.features, abbreviations, weathers, grids)
+    n_scenarios, n_drivers, n_features = tensor.shape
+    flat = pd.DataFrame(tensor.reshape(-1, n_features), columns=model.features)
+    predicted = np.asarray(model.predict(flat)).reshape(n_scenarios, n_drivers)
+    ranked = ranks(predicted)
+    for s, scenario in enumerate(described):
+        scenario["predicted_rank"] = ranked[s].tolist()
+        scenario["predicted_position"] = np.round(predicted[s], 3).tolist()
+    return {"drivers": abbreviations, "scenarios": described}
@@ -0,0 +1,128 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+# Per-season results store.
+# Keeps the race classification of every finished round on disk (one Parquet
+# file per season, sorted by round) so /predict can read all prior rounds with
+# a single slice instead of reloading every FastF1 session of the season.
+
+SEASON_STORE_DIR = 'season_results'
+STORE_COLUMNS = ['Year', 'RoundNumber', 'Abbreviation', 'FullName', 'TeamName', 'GridPosition', 'Position', 'Points']
+NUMERIC_COLUMNS = ['GridPosition', 'Position', 'Points']
+
+
+def _normalize(results, year, round_number):
+    """Reduce a FastF1 results frame (or dataset rows) to the store schema."""
+    df = pd.DataFrame(index=range(len(results)))
+    df['Year'] = int(year)
+    df['RoundNumber'] = int(round_number)
+    for col in STORE_COLUMNS[2:]:
+        df[col] = results[col].values if col in results.columns else np.nan
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    for col in ['Abbreviation', 'FullName', 'TeamName']:
+        df[col] = df[col].astype('string')
+    return df
+
+
+class SeasonResultsStore:
+    def __init__(self, root=SEASON_STORE_DIR):
+        self.root = root
+        self._seasons = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, year):
+        return os.path.join(self.root, f"{int(year)}.parquet")
+
+    def _season(self, year):
+        # Caller must hold self._lock
+        if year not in self._seasons:
+            path = self._path(year)
+            if os.path.exists(path):
+                df = pd.read_parquet(path)
+            else:
+                df = _normalize(pd.DataFrame(), year, 0).iloc[0:0]
+            self._seasons[year] = df.sort_values('RoundNumber', kind='stable').reset_index(drop=True)
+        return self._seasons[year]
+
+    def _write(self, year, df):
+        # Atomic replace so readers in other processes never see a partial file
+        path = self._path(year)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        self._seasons[year] = df
+
+    def years(self):
+        """Seasons with a file in the store."""
+        return sorted(int(name[:-len('.parquet')]) for name in os.listdir(self.root)
+                      if name.endswith('.parquet') and name[:-len('.parquet')].isdigit())
+
+    def subscribe(self, fn):
+        """Call `fn(year, round_number, rows)` after every add_round."""
+        self._listeners.append(fn)
+        return fn
+
+    def rounds(self, year):
+        """Set of round numbers already stored for a season."""
+        with self._lock:
+            return set(self._season(int(year))['RoundNumber'].unique().tolist())
+
+    def prior_results(self, year, round_number):
+        """All stored rows of `year` with RoundNumber < round_number."""
+        with self._lock:
+            df = self._season(int(year))
+            end = np.searchsorted(df['RoundNumber'].values, int(round_number), side='left')
+            return df.iloc[:end].copy()
+
+    def season_results(self, year):
+        with self._lock:
+            return self._season(int(year)).copy()
+
+    def add_round(self, year, round_number, results):
+        """Insert (or replace) one round of results and persist the season.
+
+        Returns False, without rewriting the file or notifying listeners, when
+        the round is already stored with the same results.
+        """
+        if results is None or len(results) == 0:
+            return False
+        year, round_number = int(year), int(round_number)
+        new_rows = _normalize(results, year, round_number)
+        with self._lock:
+            df = self._season(year)
+            if df[df['RoundNumber'] == round_number].reset_index(drop=True).equals(new_rows):
+                return False
+            df = pd.concat([df[df['RoundNumber'] != round_number], new_rows], ignore_index=True)
+            self._write(year, df.sort_values('RoundNumber', kind='stable').reset_index(drop=True))
+        for fn in self._listeners:
+            fn(year, round_number, new_rows)
+        return True
+
+    def seed(self, historical_df):
+        """Fill the store from historical dataset rows: rounds not stored yet, and stored
+        rounds whose results differ from the dataset's (corrections). Returns rounds written."""
+        if historical_df is None or historical_df.empty:
+            return 0
+        added = 0
+        for year, df_year in historical_df.groupby('Year'):
+            year = int(year)
+            with self._lock:
+                df = self._season(year)
+                stored = {int(r): rows.reset_index(drop=True) for r, rows in df.groupby('RoundNumber')}
+                replaced, parts = set(), []
+                for round_number, rows in df_year.groupby('RoundNumber'):
+                    new_rows = _normalize(rows, year, round_number)
+                    current = stored.get(int(round_number))
+                    if current is None or not current.equals(new_rows):
+                        replaced.add(int(round_number))
+                        parts.append(new_rows)
+                if parts:
+                    added += len(parts)
+                    df = pd.concat([df[~df['RoundNumber'].isin(replaced)]] + parts, ignore_index=True)
+                    self._write(year, df.sort_values('RoundNumber', kind='stable').reset_index(drop=True))
+        return added
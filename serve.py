@@ -0,0 +1,102 @@
+import argparse
+import gc
+import os
+import signal
+import socket
+import time
+import uvicorn
+
+# Production launch mode: N uvicorn workers over one copy of the artifacts.
+# This process binds the port, imports the app and loads the model and the
+# historical data once, then forks the workers. They inherit the loaded
+# objects copy-on-write and the compact forest as a shared read-only mmap, so
+# adding a worker adds little resident memory. A worker that dies is forked
+# again from the same loaded state.
+#   python serve.py --workers 4 --port 8000
+# Per-process state stays per worker: session cache, /metrics counters and
+# /admin/reload (which reloads only the worker that serves it). The active model
+# is shared through the registry's CURRENT file instead: an activation or a
+# train_model.py promotion swaps the serving worker at once, and every other
+# worker within F1_MODEL_POLL_SECONDS (default 10s).
+
+RESTART_DELAY = 1.0
+
+
+def _bind(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _worker(app, sock, log_level):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    config = uvicorn.Config(app, log_level=log_level, lifespan='on')
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(workers, host='127.0.0.1', port=8000, log_level='info'):
+    sock = _bind(host, port)
+    import api
+    start = time.perf_counter()
+    if not api.artifacts.load_all():
+        print("!! Some artifacts failed to load; workers will retry them at startup")
+    print(f"Artifacts loaded once in {time.perf_counter() - start:.2f}s; forking {workers} workers on {host}:{port}")
+    # Objects that exist now are shared with every worker; keep the collector from touching (copying) them
+    gc.collect()
+    gc.freeze()
+
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _worker(api.app, sock, log_level)
+            except BaseException:
+                import traceback
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        children.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            print(f"!! Worker {pid} exited (status {status}); restarting")
+            time.sleep(RESTART_DELAY)
+            spawn()
+    sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the API with several workers sharing loaded artifacts.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--log-level', default='info')
+    args = parser.parse_args()
+    serve(args.workers, args.host, args.port, args.log_level)
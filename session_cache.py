@@ -0,0 +1,150 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+import pandas as pd
+from data_source import get_source
+from weather_features import lap_seconds, race_window, summarize_weather
+
+# In-memory LRU cache of event schedules and loaded sessions, shared by
+# api.py and build_dataset.py. Bounded by an estimate of the bytes held, with
+# hit/miss counters. Concurrent misses on the same key load only once.
+# Sessions are kept as SessionData: the full weather series is reduced on load.
+
+SESSION_CACHE_BYTES = int(os.environ.get('F1_SESSION_CACHE_MB', '256')) * 1024 * 1024
+
+
+def _frame_bytes(df):
+    if isinstance(df, pd.DataFrame):
+        return int(df.memory_usage(deep=True).sum())
+    return 0
+
+
+def estimate_size(value):
+    """Approximate resident size of a cached schedule or session."""
+    if isinstance(value, pd.DataFrame):
+        return _frame_bytes(value)
+    size = sys.getsizeof(value)
+    # Only touch attributes that are already loaded; FastF1 raises on the rest
+    for attr in ('results', 'weather_data', '_results', '_weather_data', '_laps', '_track_status', '_race_control_messages'):
+        size += _frame_bytes(getattr(value, attr, None))
+    return size
+
+
+class LRUCache:
+    """Thread-safe LRU keyed by any hashable, evicting by total estimated bytes."""
+
+    def __init__(self, max_bytes=SESSION_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key][0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._items:
+                self.bytes -= self._items.pop(key)[1]
+            if size > self.max_bytes:
+                return value
+            self._items[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes and self._items:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+        return value
+
+    def get_or_load(self, key, loader):
+        """Cached value for `key`, calling `loader()` once on a miss even under concurrency."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another thread may have filled it while we waited
+            with self._lock:
+                if key in self._items:
+                    self._items.move_to_end(key)
+                    return self._items[key][0]
+            try:
+                return self.put(key, loader())
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class SessionData:
+    """The parts of a loaded race session the app uses.
+
+    `weather_data` keeps only the start-of-race sample; `weather_window` holds
+    the reduction of the full series (see weather_features.py).
+    """
+
+    def __init__(self, results, weather_data, weather_window, event):
+        self.results = results
+        self.weather_data = weather_data
+        self.weather_window = weather_window
+        self.event = event
+
+    @classmethod
+    def from_session(cls, session):
+        weather = session.weather_data
+        # Sources that already store the reduction (replay from the dataset) provide it directly
+        window = getattr(session, 'weather_window', None)
+        if window is None:
+            start, end = race_window(session)
+            window = summarize_weather(weather, lap_seconds(session.results), start, end)
+        start = weather.iloc[:1].reset_index(drop=True) if weather is not None else None
+        return cls(session.results, start, window, session.event)
+
+
+class SessionCache:
+    """Schedules keyed by year, race sessions keyed by (year, round, session type)."""
+
+    def __init__(self, max_bytes=SESSION_CACHE_BYTES, source=None):
+        self.cache = LRUCache(max_bytes)
+        # Live FastF1 or the offline replay backend (see data_source.py)
+        self.source = source or get_source()
+
+    def schedule(self, year):
+        """Event schedule without testing events. Treat the result as read-only."""
+        def load():
+            schedule = self.source.get_event_schedule(year, include_testing=False)
+            return schedule[schedule['EventFormat'] != 'testing']
+        return self.cache.get_or_load(('schedule', int(year)), load)
+
+    def session(self, year, round_number, kind='R'):
+        """SessionData with results and weather of a loaded session. Treat it as read-only."""
+        def load():
+            session = self.source.get_session(int(year), int(round_number), kind)
+            session.load(weather=True, telemetry=False, messages=False)
+            return SessionData.from_session(session)
+        return self.cache.get_or_load(('session', int(year), int(round_number), kind), load)
+
+    def stats(self):
+        return self.cache.stats()
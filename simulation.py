@@ -0,0 +1,193 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from race_features import feature_frame
+
+# Monte Carlo finishing orders from the forest's per-tree spread.
+# Each simulated race draws, for every driver independently, the prediction of
+# one random tree; sorting those draws gives a finishing order. Season
+# projections add the points of the remaining rounds to the current standings.
+#   python simulation.py --year 2024 --after-round 12 --sims 100000 --workers 4
+
+POINTS = [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]
+# Conditions assumed for rounds not run yet: dataset medians, dry
+TYPICAL_WEATHER = pd.Series({'AirTemp': 23.7, 'TrackTemp': 36.9, 'Humidity': 53.9, 'Rainfall': False})
+CHUNK_SIMS = 5000  # simulations per vectorized block (bounds peak memory)
+
+
+# --- 1. Sampling ---
+def points_by_rank(n_drivers):
+    table = np.zeros(n_drivers)
+    table[:min(n_drivers, len(POINTS))] = POINTS[:n_drivers]
+    return table
+
+
+def sample_orders(per_tree, shape, rng):
+    """Finishing orders, shape `shape + (n_drivers,)`: entry [..., k] is the driver finishing k+1th."""
+    n_drivers, n_trees = per_tree.shape
+    trees = rng.integers(n_trees, size=shape + (n_drivers,))
+    draws = per_tree[np.arange(n_drivers), trees]
+    # Leaf values repeat across trees; a random tiebreak keeps ties unbiased
+    draws = draws + rng.random(draws.shape) * 1e-6
+    return np.argsort(draws, axis=-1)
+
+
+def finishing_positions(orders):
+    """Inverse of `sample_orders`: 0-based finishing position of every driver."""
+    positions = np.empty_like(orders)
+    np.put_along_axis(positions, orders, np.arange(orders.shape[-1]), axis=-1)
+    return positions
+
+
+# --- 2. Single race ---
+def simulate_race(per_tree, n_sims=10000, seed=None):
+    """Finishing-position distribution of one race.
+
+    Returns probabilities of shape (n_drivers, n_drivers), [driver, position],
+    and the expected points per driver.
+    """
+    rng = np.random.default_rng(seed)
+    n_drivers = per_tree.shape[0]
+    counts = np.zeros((n_drivers, n_drivers), dtype=np.int64)
+    for start in range(0, n_sims, CHUNK_SIMS):
+        positions = finishing_positions(sample_orders(per_tree, (min(CHUNK_SIMS, n_sims - start),), rng))
+        # One bincount over (driver, position) pairs for the whole block
+        flat = np.arange(n_drivers)[None, :] * n_drivers + positions
+        counts += np.bincount(flat.ravel(), minlength=n_drivers * n_drivers).reshape(n_drivers, n_drivers)
+    probs = counts / n_sims
+    return probs, probs @ points_by_rank(n_drivers)
+
+
+# --- 3. Season ---
+def _season_chunk(per_tree, n_rounds, n_sims, base_points, team_index, team_base, seed):
+    """Title counts and summed final points over `n_sims` simulated seasons."""
+    rng = np.random.default_rng(seed)
+    n_drivers, n_teams = per_tree.shape[0], len(team_base)
+    teams = np.zeros((n_drivers, n_teams))
+    teams[np.arange(n_drivers), team_index] = 1
+    table = points_by_rank(n_drivers)
+    driver_titles = np.zeros(n_drivers, dtype=np.int64)
+    team_titles = np.zeros(n_teams, dtype=np.int64)
+    points_sum = np.zeros(n_drivers)
+    for start in range(0, n_sims, CHUNK_SIMS):
+        size = min(CHUNK_SIMS, n_sims - start)
+        if n_rounds:
+            positions = finishing_positions(sample_orders(per_tree, (size, n_rounds), rng))
+            totals = base_points + table[positions].sum(axis=1)
+        else:
+            totals = np.broadcast_to(base_points, (size, n_drivers))
+        team_totals = team_base + (totals - base_points) @ teams
+        # Ties on points are split at random (countback isn't modelled)
+        driver_titles += np.bincount(np.argmax(totals + rng.random(totals.shape) * 1e-3, axis=1), minlength=n_drivers)
+        team_titles += np.bincount(np.argmax(team_totals + rng.random(team_totals.shape) * 1e-3, axis=1), minlength=n_teams)
+        points_sum += totals.sum(axis=0)
+    return driver_titles, team_titles, points_sum
+
+
+def simulate_season(per_tree, n_rounds, base_points, team_index, team_base, n_sims=100000, workers=None, seed=None):
+    """Championship probabilities after `n_rounds` more races.
+
+    `base_points`/`team_base` are the current standings; `team_index` maps
+    drivers to teams. `workers` > 1 splits the simulations across a process pool.
+    Returns (driver title probs, team title probs, expected driver points).
+    """
+    workers = workers or 1
+    sizes = [n_sims // workers + (1 if i < n_sims % workers else 0) for i in range(workers)]
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    args = [(per_tree, n_rounds, size, base_points, team_index, team_base, s) for size, s in zip(sizes, seeds) if size]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_season_chunk, *zip(*args)))
+    else:
+        parts = [_season_chunk(*a) for a in args]
+    driver_titles, team_titles, points_sum = (sum(p[i] for p in parts) for i in range(3))
+    return driver_titles / n_sims, team_titles / n_sims, points_sum / n_sims
+
+
+def projection_inputs(store, form, year, after_round, weather=TYPICAL_WEATHER):
+    """Entry list, model rows and driver/team standings for projecting a season after `after_round`.
+
+    Every remaining race uses the same rows: each driver's mean grid so far,
+    form as of `after_round` and `weather`.
+    """
+    season = store.prior_results(year, after_round + 1)
+    if season.empty:
+        raise ValueError(f"No results stored for {year} up to round {after_round}")
+    last_round = season['RoundNumber'].max()
+    entries = season[season['RoundNumber'] == last_round].drop_duplicates('Abbreviation').reset_index(drop=True)
+    form_rows = form.features(year, after_round + 1, entries)
+    race_rows = entries.copy()
+    race_rows['GridPosition'] = season.groupby('Abbreviation')['GridPosition'].mean().reindex(entries['Abbreviation']).values
+    X = feature_frame(race_rows, form_rows, weather)
+    standings = season.groupby('Abbreviation')['Points'].sum().reindex(entries['Abbreviation']).fillna(0).to_numpy()
+    # Team totals include points of drivers no longer on the entry list
+    team_standings = season.groupby(season['TeamName'].astype(str))['Points'].sum()
+    return entries, X, standings, team_standings
+
+
+def project_season(model, store, form, schedule, year, after_round=None, n_sims=100000, workers=None, seed=None):
+    """Driver and constructor title probabilities, best first."""
+    if after_round is None:
+        stored = store.rounds(year)
+        after_round = max(stored) if stored else 0
+    entries, X, standings, team_standings = projection_inputs(store, form, year, after_round)
+    remaining = int((schedule['RoundNumber'] > after_round).sum())
+    team_names, team_index = np.unique(entries['TeamName'].astype(str).to_numpy(), return_inverse=True)
+    team_base = team_standings.reindex(team_names).fillna(0).to_numpy()
+    driver_p, team_p, expected = simulate_season(model.predict_per_tree(X), remaining, standings,
+                                                 team_index, team_base, n_sims, workers, seed)
+    drivers = [{"Abbreviation": a, "TeamName": t, "points": float(p), "expected_points": round(float(e), 2),
+                "title_probability": float(pr)}
+               for a, t, p, e, pr in zip(entries['Abbreviation'], entries['TeamName'], standings, expected, driver_p)]
+    constructors = [{"TeamName": t, "points": float(p), "title_probability": float(pr)}
+                    for t, p, pr in zip(team_names, team_base, team_p)]
+    return {"year": year, "after_round": int(after_round), "remaining_rounds": remaining, "simulations": n_sims,
+            "drivers": sorted(drivers, key=lambda d: (-d['title_probability'], -d['expected_points'])),
+            "constructors": sorted(constructors, key=lambda c: -c['title_probability'])}
+
+
+def race_distribution(model, race_data, X, n_sims=10000, seed=None):
+    """Per-driver win/podium/points probabilities for one race."""
+    probs, expected = simulate_race(model.predict_per_tree(X), n_sims, seed)
+    rows = []
+    for i, (abbr, team) in enumerate(zip(race_data['Abbreviation'], race_data['TeamName'])):
+        rows.append({"Abbreviation": abbr, "TeamName": team, "win": float(probs[i, 0]),
+                     "podium": float(probs[i, :3].sum()), "points": float(probs[i, :len(POINTS)].sum()),
+                     "expected_points": round(float(expected[i]), 2),
+                     "position_probabilities": np.round(probs[i], 4).tolist()})
+    return sorted(rows, key=lambda r: -r['expected_points'])
+
+
+if __name__ == "__main__":
+    from form_features import FormIndex
+    from model_registry import ModelRegistry
+    from season_store import SeasonResultsStore
+    from session_cache import SessionCache
+
+    parser = argparse.ArgumentParser(description="Project championship probabilities by simulation.")
+    parser.add_argument('--year', type=int, required=True)
+    parser.add_argument('--after-round', type=int, help="Last round treated as final (default: latest stored)")
+    parser.add_argument('--sims', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    model = ModelRegistry().get()
+    schedule = SessionCache().schedule(args.year)
+    store = SeasonResultsStore()
+    form = FormIndex()
+    form.build(pd.concat([store.season_results(y) for y in store.years()], ignore_index=True))
+    start = time.perf_counter()
+    result = project_season(model, store, form, schedule, args.year, args.after_round,
+                            args.sims, args.workers, args.seed)
+    print(f"{args.sims} seasons from round {result['after_round']} ({result['remaining_rounds']} to go) "
+          f"in {time.perf_counter() - start:.2f}s")
+    print("\n--- Drivers' title ---")
+    for d in result['drivers'][:10]:
+        print(f"{d['Abbreviation']:>4} {d['title_probability']:7.2%}  {d['points']:.0f} pts, expected {d['expected_points']:.1f}")
+    print("\n--- Constructors' title ---")
+    for c in result['constructors'][:5]:
+        print(f"{c['TeamName']:<20} {c['title_probability']:7.2%}")
@@ -3,71 +3,28 @@ from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 # from sklearn.preprocessing import LabelEncoder  <-- No longer needed
 from sklearn.metrics import r2_score, mean_absolute_error
-import joblib
+from dataset import DATASET_DIR
+from race_features import FEATURES
+from training_data import available_window_features, load_training_frame, TARGET
+from model_registry import ModelRegistry
 
 print("Starting Model Trainer (v2 with 'Form' features)...")
 
 # --- 1. Load Data ---
 try:
-    df = pd.read_csv('f1_race_data_2018_2024.csv')
-    print(f"Successfully loaded dataset with {len(df)} rows.")
+    print("Loading dataset and calculating 'Recent Form' features...")
+    df = load_training_frame()
+    print(f"Rows after cleaning: {len(df)}")
 except FileNotFoundError:
-    print("Error: `f1_race_data_2018_2024.csv` not found.")
+    print(f"Error: dataset `{DATASET_DIR}/` not found.")
     print("Please run `build_dataset.py` first!")
     exit()
 
-# --- 2. Data Cleaning & Preparation ---
-
-# We need 'Points' and 'Position'
-df['Position'] = pd.to_numeric(df['Position'], errors='coerce')
-df['Points'] = pd.to_numeric(df['Points'], errors='coerce')
-df['GridPosition'] = pd.to_numeric(df['GridPosition'], errors='coerce')
-
-# Handle Rainfall
-df['Rainfall'] = df['Rainfall'].apply(lambda x: 1 if x == True or x > 0 else 0)
-
-# Sort by time. This is CRITICAL for calculating 'form'
-df = df.sort_values(by=['Year', 'RoundNumber'])
-
-# Drop rows where our target (Position) or key features are missing
-df = df.dropna(subset=['Position', 'GridPosition', 'AirTemp', 'TrackTemp', 'Points'])
-
-print(f"Rows after cleaning: {len(df)}")
-
-# --- 3. Feature Engineering (v2 - Recent Form) ---
-
-print("Calculating 'Recent Form' features...")
-
-# We'll calculate a driver's average points in their last 5 races
-# min_periods=1 means it will calculate even if they only have 1 race (i.e., for rookies)
-df['driver_form'] = df.groupby('Abbreviation')['Points'].transform(
-    lambda x: x.shift(1).rolling(window=5, min_periods=1).mean()
-).fillna(0) # fillna(0) is for a driver's first-ever race
-
-# We'll do the same for the constructor
-df['constructor_form'] = df.groupby('TeamName')['Points'].transform(
-    lambda x: x.shift(1).rolling(window=5, min_periods=1).mean()
-).fillna(0)
-
-
-# Define our features (X) and target (y)
-features = [
-    'GridPosition',
-    # 'DriverEncoded',      <-- REMOVED
-    # 'ConstructorEncoded', <-- REMOVED
-    'driver_form',        # <-- NEW
-    'constructor_form',   # <-- NEW
-    'AirTemp',
-    'TrackTemp',
-    'Humidity',
-    'Rainfall'
-]
-
-# This is what we want to predict
-target = 'Position'
-
-# Drop any rows that might have NaN after feature engineering (though fillna(0) should prevent it)
-df = df.dropna(subset=features)
+# --- 2. Features (X) and target (y) ---
+# Same feature list the API builds (race_features.FEATURES), plus the
+# weather-window features once every round in the dataset has them
+features = FEATURES + available_window_features(df)
+target = TARGET
 
 X = df[features]
 y = df[target]
@@ -75,7 +32,7 @@ y = df[target]
 print(f"Using new features: {features}")
 print(f"Predicting target: {target}")
 
-# --- 4. Split Data ---
+# --- 3. Split Data ---
 df_train = df[df['Year'] < 2024]
 df_test = df[df['Year'] == 2024]
 
@@ -91,13 +48,13 @@ else:
 
 print(f"Training samples: {len(X_train)}, Test samples: {len(X_test)}")
 
-# --- 5. Train Model ---
+# --- 4. Train Model ---
 print("Training RandomForestRegressor model...")
 model = RandomForestRegressor(n_estimators=100, random_state=42, min_samples_leaf=5)
 model.fit(X_train, y_train)
 print("Model training complete.")
 
-# --- 6. Evaluate Model ---
+# --- 5. Evaluate Model ---
 y_pred = model.predict(X_test)
 
 r2 = r2_score(y_test, y_pred)
@@ -114,15 +71,17 @@ importance_df = pd.DataFrame({
 }).sort_values(by='importance', ascending=False)
 print(importance_df)
 
-# --- 7. Save Model (Encoders NO LONGER NEEDED) ---
-model_filename = 'f1_prediction_model.joblib'
-joblib.dump(model, model_filename)
-
-# We don't save encoders anymore
-# encoders_filename = 'f1_encoders.joblib'
-# joblib.dump({'driver_encoder': driver_encoder, 'constructor_encoder': constructor_encoder}, encoders_filename)
-
-print(f"\nModel saved to {model_filename}")
-print("Encoders are no longer used.")
+# --- 6. Register Model ---
+# Each run becomes a new version in the local registry (models/<version>/) with
+# its feature schema and metrics; the API can activate or pin it without a restart.
+registry = ModelRegistry()
+version = registry.register(
+    model, features,
+    metrics={"r2": float(r2), "mae": float(mae)},
+    params=model.get_params(),
+    extra={"train_rows": len(X_train), "test_rows": len(X_test)},
+)
+
+print(f"\nModel registered as {version} in {registry.root}/ (now active)")
 print("\n--- Model training script finished ---")
-print("Next step: Update `api.py` to use these new features!")
\ No newline at end of file
+print("Running API picks it up via POST /models/{version}/activate or /admin/reload.")
@@ -0,0 +1,42 @@
+from dataset import load_dataset
+from form_features import add_form_features
+from race_features import FEATURES
+from weather_features import WEATHER_WINDOW_FEATURES
+
+# Training frame shared by train_model.py and tune_model.py: typed dataset rows
+# with the same form features the API computes at serving time.
+
+TRAINING_COLUMNS = ['Year', 'RoundNumber', 'Abbreviation', 'TeamName', 'GridPosition', 'Position',
+                    'Points', 'AirTemp', 'TrackTemp', 'Humidity', 'Rainfall'] + WEATHER_WINDOW_FEATURES
+TARGET = 'Position'
+
+
+def load_training_frame():
+    """Rows ready for fitting, sorted by (Year, RoundNumber). Raises FileNotFoundError without a dataset."""
+    df = load_dataset(TRAINING_COLUMNS)
+
+    # Columns are already typed by the dataset schema; Rainfall becomes a 0/1 feature
+    df['Rainfall'] = df['Rainfall'].astype(int)
+
+    # Sort by time. This is CRITICAL for calculating 'form'
+    df = df.sort_values(by=['Year', 'RoundNumber'], kind='stable')
+
+    # A driver's (and constructor's) average points in their last 5 races before
+    # this one, DNFs included. Same code path as the API (form_features.py), so
+    # there is no train/serve skew. Rookies start at 0.
+    # Computed before dropping rows so unclassified results still count as form.
+    df = add_form_features(df)
+
+    # Drop rows where our target (Position) or key features are missing
+    df = df.dropna(subset=[TARGET, 'GridPosition', 'AirTemp', 'TrackTemp', 'Points'])
+    return df.dropna(subset=FEATURES)
+
+
+def available_window_features(df):
+    """Weather-window features present for every training row.
+
+    Rounds imported from the CSV have none until `build_dataset.py --backfill-weather` fetches them.
+    """
+    if df['TrackTempMean'].isna().any():
+        return []
+    return [f for f in WEATHER_WINDOW_FEATURES if df[f].notna().all()]
@@ -0,0 +1,168 @@
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from dataset import DATASET_DIR, dataset_version
+from race_features import FEATURES
+from training_data import TARGET, load_training_frame
+
+# Walk-forward backtest + hyperparameter grid for the RandomForestRegressor.
+#   season mode: train on every season before S, test on season S
+#   round mode:  inside the test season, train on everything before round R, test on R
+# Fold matrices are written once as .npy (keyed by dataset version) and
+# memory-mapped by the worker processes, so no configuration rebuilds features.
+
+FOLD_CACHE_DIR = 'tuning_cache'
+LEADERBOARD_FILE = 'tuning_leaderboard.json'
+DEFAULT_GRID = {
+    'n_estimators': [100, 200],
+    'min_samples_leaf': [1, 5, 10],
+    'max_depth': [None, 12],
+    'max_features': [1.0, 'sqrt'],
+}
+
+
+# --- 1. Folds ---
+def make_folds(df, mode='season', min_train_seasons=2, test_season=None, round_step=1):
+    """List of (name, train_mask, test_mask) over the rows of `df`, in time order."""
+    years = sorted(df['Year'].unique())
+    folds = []
+    if mode == 'season':
+        for year in years[min_train_seasons:]:
+            folds.append((f"season-{year}", (df['Year'] < year).to_numpy(), (df['Year'] == year).to_numpy()))
+    elif mode == 'round':
+        year = test_season or years[-1]
+        rounds = sorted(df.loc[df['Year'] == year, 'RoundNumber'].unique())
+        for i in range(0, len(rounds), round_step):
+            block = rounds[i:i + round_step]
+            before = (df['Year'] < year) | ((df['Year'] == year) & (df['RoundNumber'] < block[0]))
+            test = (df['Year'] == year) & df['RoundNumber'].isin(block)
+            folds.append((f"round-{year}-{block[0]}" + (f"-{block[-1]}" if len(block) > 1 else ''),
+                          before.to_numpy(), test.to_numpy()))
+    else:
+        raise ValueError(f"Unknown fold mode {mode!r}")
+    return folds
+
+
+def cache_folds(df, folds, cache_dir):
+    """Write each fold's X/y once; returns fold descriptors the workers can mmap."""
+    os.makedirs(cache_dir, exist_ok=True)
+    X = df[FEATURES].to_numpy(dtype=np.float64)
+    y = df[TARGET].to_numpy(dtype=np.float64)
+    descriptors = []
+    for name, train_mask, test_mask in folds:
+        paths = {part: os.path.join(cache_dir, f"{name}.{part}.npy") for part in ('X_train', 'y_train', 'X_test', 'y_test')}
+        if not all(os.path.exists(p) for p in paths.values()):
+            np.save(paths['X_train'], X[train_mask]); np.save(paths['y_train'], y[train_mask])
+            np.save(paths['X_test'], X[test_mask]); np.save(paths['y_test'], y[test_mask])
+        descriptors.append({"name": name, "paths": paths, "n_train": int(train_mask.sum()), "n_test": int(test_mask.sum())})
+    return descriptors
+
+
+# --- 2. Worker ---
+_fold_arrays = {}
+
+
+def _load_fold(fold):
+    # Per-process memo: each worker maps a fold's arrays once
+    if fold['name'] not in _fold_arrays:
+        _fold_arrays[fold['name']] = {part: np.load(path, mmap_mode='r') for part, path in fold['paths'].items()}
+    return _fold_arrays[fold['name']]
+
+
+def evaluate(params, fold, random_state=42):
+    """Fit one configuration on one fold; returns its test metrics."""
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.metrics import mean_absolute_error, r2_score
+    arrays = _load_fold(fold)
+    start = time.perf_counter()
+    model = RandomForestRegressor(random_state=random_state, n_jobs=1, **params)
+    model.fit(arrays['X_train'], arrays['y_train'])
+    y_pred = model.predict(arrays['X_test'])
+    y_test = np.asarray(arrays['y_test'])
+    return {"mae": float(mean_absolute_error(y_test, y_pred)),
+            "r2": float(r2_score(y_test, y_pred)) if len(y_test) > 1 else None,
+            "n_test": fold['n_test'], "fit_seconds": time.perf_counter() - start}
+
+
+# --- 3. Search ---
+def expand_grid(grid):
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def leaderboard(configs, scores):
+    """Aggregate fold scores per configuration, best (lowest weighted MAE) first."""
+    rows = []
+    for i, params in enumerate(configs):
+        fold_scores = scores[i]
+        weights = np.array([s['n_test'] for s in fold_scores], dtype=float)
+        maes = np.array([s['mae'] for s in fold_scores])
+        r2s = [s['r2'] for s in fold_scores if s['r2'] is not None]
+        rows.append({
+            "params": params,
+            "mae": float(np.average(maes, weights=weights)),
+            "mae_std": float(maes.std()),
+            "r2": float(np.mean(r2s)) if r2s else None,
+            "folds": len(fold_scores),
+            "fit_seconds": float(sum(s['fit_seconds'] for s in fold_scores)),
+        })
+    rows.sort(key=lambda r: r['mae'])
+    for rank, row in enumerate(rows, 1):
+        row['rank'] = rank
+    return rows
+
+
+def search(df, grid=DEFAULT_GRID, mode='season', workers=None, cache_dir=FOLD_CACHE_DIR, **fold_args):
+    folds = make_folds(df, mode, **fold_args)
+    fold_dir = os.path.join(cache_dir, f"{dataset_version(DATASET_DIR) or 'nodata'}-{mode}-" +
+                            "-".join(f"{k}{v}" for k, v in sorted(fold_args.items())))
+    descriptors = cache_folds(df, folds, fold_dir)
+    configs = expand_grid(grid)
+    print(f"{len(configs)} configurations x {len(descriptors)} folds on {workers or os.cpu_count()} processes")
+
+    scores = {i: [] for i in range(len(configs))}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(evaluate, params, fold): i
+                   for i, params in enumerate(configs) for fold in descriptors}
+        for done, future in enumerate(as_completed(futures), 1):
+            scores[futures[future]].append(future.result())
+            if done % 20 == 0 or done == len(futures):
+                print(f"  {done}/{len(futures)} fits done")
+    return {"mode": mode, "folds": [{k: d[k] for k in ('name', 'n_train', 'n_test')} for d in descriptors],
+            "dataset_version": dataset_version(DATASET_DIR), "leaderboard": leaderboard(configs, scores)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward hyperparameter search for the race model.")
+    parser.add_argument('--mode', choices=['season', 'round'], default='season')
+    parser.add_argument('--test-season', type=int, help="Season walked round by round (round mode; default: latest)")
+    parser.add_argument('--round-step', type=int, default=1, help="Rounds per fold in round mode")
+    parser.add_argument('--min-train-seasons', type=int, default=2, help="Seasons always kept for training (season mode)")
+    parser.add_argument('--grid', help="JSON file with {param: [values]} overriding the default grid")
+    parser.add_argument('--workers', type=int, default=None, help="Processes (default: all cores)")
+    parser.add_argument('--output', default=LEADERBOARD_FILE)
+    args = parser.parse_args()
+
+    print("Starting walk-forward hyperparameter search...")
+    grid = DEFAULT_GRID
+    if args.grid:
+        with open(args.grid) as f:
+            grid = json.load(f)
+    fold_args = ({"min_train_seasons": args.min_train_seasons} if args.mode == 'season'
+                 else {"test_season": args.test_season, "round_step": args.round_step})
+
+    start = time.perf_counter()
+    result = search(load_training_frame(), grid, args.mode, args.workers, **fold_args)
+    result['seconds'] = round(time.perf_counter() - start, 1)
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=1)
+
+    print(f"\n--- Leaderboard (weighted MAE over {len(result['folds'])} folds, {result['seconds']}s) ---")
+    for row in result['leaderboard'][:10]:
+        r2 = f"{row['r2']:.4f}" if row['r2'] is not None else "n/a"
+        print(f"{row['rank']:>3}. MAE {row['mae']:.4f} (+/- {row['mae_std']:.3f})  R2 {r2}  {row['params']}")
+    print(f"\nFull leaderboard written to {args.output}")
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+# Reduces a session's full weather series (one sample a minute in FastF1) to a
+# handful of race-window numbers in a single pass over the samples. The window
+# runs from the session start to the end of the last lap; the feed before and
+# after it (pre-race build-up, podium) is ignored. The reduction is what gets
+# cached and stored; the series itself is dropped.
+
+WEATHER_WINDOW_FEATURES = ['TrackTempMin', 'TrackTempMax', 'TrackTempMean', 'RainMinutes', 'FirstRainLap']
+SAMPLE_SECONDS = 60.0  # nominal spacing, used for the last sample and series without a Time column
+CHUNK_ROWS = 256
+DRY_LAP = -1.0  # FirstRainLap of a race without rain
+
+
+class WeatherWindow:
+    """Running min/max/mean track temperature and rain time over a weather series.
+
+    Feed samples in time order with `update`, in as many chunks as convenient.
+    """
+
+    def __init__(self):
+        self.track_min = np.inf
+        self.track_max = -np.inf
+        self.track_sum = 0.0
+        self.samples = 0
+        self.rain_seconds = 0.0
+        self.first_rain = None  # seconds from the window start
+        self._last_time = None
+        self._last_rain = False
+
+    def update(self, seconds, track_temp, rainfall):
+        seconds = np.asarray(seconds, dtype=np.float64)
+        track_temp = np.asarray(track_temp, dtype=np.float64)
+        rainfall = np.asarray(rainfall, dtype=bool)
+        if not len(seconds):
+            return self
+        valid = ~np.isnan(track_temp)
+        if valid.any():
+            self.track_min = min(self.track_min, track_temp[valid].min())
+            self.track_max = max(self.track_max, track_temp[valid].max())
+            self.track_sum += track_temp[valid].sum()
+            self.samples += int(valid.sum())
+        # A rainy sample lasts until the next one, which may be in this chunk or the previous one's tail
+        if self._last_rain:
+            self.rain_seconds += seconds[0] - self._last_time
+        self.rain_seconds += np.diff(seconds)[rainfall[:-1]].sum()
+        if self.first_rain is None and rainfall.any():
+            self.first_rain = float(seconds[np.argmax(rainfall)])
+        self._last_time, self._last_rain = seconds[-1], bool(rainfall[-1])
+        return self
+
+    def summary(self, lap_seconds=None, until=None):
+        """Features of the samples fed so far; a rainy last sample lasts until `until` (seconds)."""
+        if self._last_rain:
+            tail = until - self._last_time if until is not None else SAMPLE_SECONDS
+            rain_seconds = self.rain_seconds + max(tail, 0.0)
+        else:
+            rain_seconds = self.rain_seconds
+        if self.first_rain is None:
+            first_rain_lap = DRY_LAP
+        elif lap_seconds:
+            first_rain_lap = float(np.floor(self.first_rain / lap_seconds)) + 1
+        else:
+            first_rain_lap = np.nan
+        return {
+            'TrackTempMin': float(self.track_min) if self.samples else np.nan,
+            'TrackTempMax': float(self.track_max) if self.samples else np.nan,
+            'TrackTempMean': float(self.track_sum / self.samples) if self.samples else np.nan,
+            'RainMinutes': float(rain_seconds / 60.0),
+            'FirstRainLap': first_rain_lap,
+        }
+
+
+def lap_seconds(results):
+    """Average lap time of the winner (race time / laps), or None if unknown."""
+    if results is None or 'Time' not in results.columns or 'Laps' not in results.columns:
+        return None
+    winner = results[pd.to_numeric(results['Position'], errors='coerce') == 1]
+    if winner.empty:
+        return None
+    race_time = pd.to_timedelta(winner['Time'].iloc[0], errors='coerce')
+    laps = pd.to_numeric(winner['Laps'].iloc[0], errors='coerce')
+    if pd.isna(race_time) or not laps or pd.isna(laps):
+        return None
+    return race_time.total_seconds() / laps
+
+
+def race_window(session):
+    """(start, end) of the race in session-time seconds: session start to the end of the last lap.
+
+    Either bound is None when the session doesn't provide it (not loaded, replayed rows).
+    """
+    def seconds(value):
+        value = pd.to_timedelta(value, errors='coerce')
+        return None if pd.isna(value) else value.total_seconds()
+
+    try:
+        start = seconds(session.session_start_time)
+    except Exception:
+        start = None
+    try:
+        end = seconds(session.laps['Time'].max())
+    except Exception:
+        end = None
+    return start, end
+
+
+def summarize_weather(weather_data, lap_time=None, start=None, end=None, chunk_rows=CHUNK_ROWS):
+    """Race-window weather features of one session (dict keyed by WEATHER_WINDOW_FEATURES).
+
+    Only samples between `start` and `end` (session-time seconds, see race_window)
+    count; the sample in effect at `start` stands for the conditions at the start.
+    The first-rain lap is estimated from the time since `start` and `lap_time` (seconds).
+    """
+    window = WeatherWindow()
+    if weather_data is None or len(weather_data) == 0:
+        return window.summary(lap_time)
+    if 'Time' in weather_data.columns:
+        seconds = pd.to_timedelta(weather_data['Time']).dt.total_seconds().to_numpy()
+    else:
+        seconds = np.arange(len(weather_data)) * SAMPLE_SECONDS
+    track = pd.to_numeric(weather_data['TrackTemp'], errors='coerce').to_numpy()
+    rain = weather_data['Rainfall'].fillna(False).astype(bool).to_numpy()
+    first, last = 0, len(seconds)
+    if start is not None:
+        first = max(int(np.searchsorted(seconds, start, side='right')) - 1, 0)
+    if end is not None:
+        last = int(np.searchsorted(seconds, end, side='right'))
+    seconds, track, rain = seconds[first:last].copy(), track[first:last], rain[first:last]
+    if start is not None:
+        seconds = np.maximum(seconds, start) - start
+    for i in range(0, len(seconds), chunk_rows):
+        window.update(seconds[i:i + chunk_rows], track[i:i + chunk_rows], rain[i:i + chunk_rows])
+    until = end - (start or 0.0) if end is not None else None
+    return window.summary(lap_time, until)